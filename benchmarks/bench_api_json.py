@@ -0,0 +1,133 @@
+"""
+Microbenchmark: CPU time per request for the polling-unit list API
+===================================================================
+Builds an in-memory SQLite database with one LGA holding N polling units
+(10,000 by default) and times /api/polling-units/<lga>/ two ways:
+
+  before  - RawQuerySet hydrated into PollingUnit objects + JsonResponse
+            (the way the endpoint used to work)
+  after   - the current view: cursor tuples + results/responses.py
+
+Usage (from the project root):
+    python benchmarks/bench_api_json.py
+    python benchmarks/bench_api_json.py --rows 10000 --repeat 20
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'election_project.settings')
+
+from django.conf import settings  # noqa: E402
+
+settings.DATABASES['default'] = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'}
+settings.DEBUG = False
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.http import JsonResponse  # noqa: E402
+from django.test import RequestFactory  # noqa: E402
+
+from results import hierarchy, responses, views  # noqa: E402
+from results.models import AnnouncedLgaResults, Lga, PollingUnit, State, Ward  # noqa: E402
+
+
+def build_database(rows):
+    """Create the schema and one LGA with `rows` polling units spread over 10 wards."""
+    # Unmanaged tables first: the results migrations add indexes to them
+    with connection.schema_editor() as editor:
+        for model in (State, Lga, Ward, PollingUnit, AnnouncedLgaResults):
+            editor.create_model(model)
+    call_command('migrate', verbosity=0)
+
+    Lga.objects.create(uniqueid=1, lga_id=1, lga_name='Bench LGA', state_id=25)
+    Ward.objects.bulk_create([
+        Ward(uniqueid=w, ward_id=w, ward_name=f'Ward {w}', lga_id=1) for w in range(1, 11)
+    ])
+    PollingUnit.objects.bulk_create(
+        [
+            PollingUnit(
+                uniqueid=i, polling_unit_id=i, ward_id=i % 10 + 1, lga_id=1,
+                polling_unit_number=f'DT01{i:06d}', polling_unit_name=f'Polling Unit {i}',
+            )
+            for i in range(1, rows + 1)
+        ],
+        batch_size=1000,
+    )
+    hierarchy.rebuild_paths()
+
+
+def legacy_view(request, lga_uniqueid):
+    """The endpoint as it was: model hydration + the stock JsonResponse encoder."""
+    lga = Lga.objects.get(uniqueid=lga_uniqueid)
+    polling_units = PollingUnit.objects.raw('''
+        SELECT pu.uniqueid, pu.polling_unit_name, pu.polling_unit_number, w.ward_name
+        FROM polling_unit pu
+        LEFT JOIN ward w ON pu.ward_id = w.ward_id AND pu.lga_id = w.lga_id
+        WHERE pu.lga_id = %s AND pu.polling_unit_name IS NOT NULL AND pu.polling_unit_name != ''
+        ORDER BY w.ward_name, pu.polling_unit_name
+    ''', [lga.lga_id])
+    data = [
+        {
+            'uniqueid': pu.uniqueid,
+            'name': pu.polling_unit_name,
+            'number': pu.polling_unit_number,
+            'ward': pu.ward_name
+        }
+        for pu in polling_units
+    ]
+    return JsonResponse(data, safe=False)
+
+
+def consume(response):
+    """Read the whole body, as the WSGI server would."""
+    if response.streaming:
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+
+def measure(view, request, repeat):
+    """CPU seconds per request, and the body size."""
+    size = consume(view(request, 1))  # warm up
+    timings = []
+    for _ in range(repeat):
+        start = time.process_time()
+        consume(view(request, 1))
+        timings.append(time.process_time() - start)
+    return timings, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10000, help='polling units in the LGA')
+    parser.add_argument('--repeat', type=int, default=20, help='timed requests per variant')
+    args = parser.parse_args()
+
+    build_database(args.rows)
+    factory = RequestFactory()
+    plain = factory.get('/api/polling-units/1/')
+    gzipped = factory.get('/api/polling-units/1/', HTTP_ACCEPT_ENCODING='gzip')
+
+    encoder = 'orjson' if responses.orjson is not None else 'json (stdlib)'
+    print(f'{args.rows} polling units, {args.repeat} requests each, encoder: {encoder}\n')
+    print(f"{'variant':<24}{'median ms':>12}{'min ms':>10}{'body bytes':>14}")
+    for label, view, request in [
+        ('before', legacy_view, plain),
+        ('after', views.api_get_polling_units, plain),
+        ('after (gzip)', views.api_get_polling_units, gzipped),
+    ]:
+        timings, size = measure(view, request, args.repeat)
+        print(f'{label:<24}{statistics.median(timings) * 1000:>12.2f}{min(timings) * 1000:>10.2f}{size:>14}')
+
+
+if __name__ == '__main__':
+    main()
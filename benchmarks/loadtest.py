@@ -0,0 +1,664 @@
+"""
+Load test: boot the app and drive it with a mix of page and API traffic
+========================================================================
+Generates a dataset in a fresh SQLite file, starts the app in a separate
+process (WSGI or ASGI) and runs `--concurrency` asynchronous clients against
+it for `--duration` seconds. Each client picks its next request from the
+traffic mix:
+
+  lga_page           GET  /lga-results/?lga_id=...
+  pu_lookup          GET  /polling-unit-results/?pu_id=...
+  api_wards          GET  /api/wards/<lga>/
+  api_polling_units  GET  /api/polling-units/<lga>/
+  add_results        POST /add-results/ (with a real CSRF cookie and token)
+
+The report (JSON, see --report) has throughput, p50/p95/p99 latency, error
+rate and database lock errors per endpoint and in total. Lock errors are
+counted inside the server, so they are reported even when a view catches
+the exception and still answers.
+
+Servers:
+  wsgi  threaded wsgiref server (standard library)
+  asgi  uvicorn when installed, otherwise a minimal built-in asyncio server
+
+Usage (from the project root):
+    python benchmarks/loadtest.py
+    python benchmarks/loadtest.py --server asgi --concurrency 50 --duration 60
+    python benchmarks/loadtest.py --mix lga_page=5,add_results=1 --report after.json
+    python benchmarks/loadtest.py --database /tmp/loadtest.sqlite3   # reuse a dataset
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from http import HTTPStatus
+from pathlib import Path
+from urllib.parse import unquote, urlencode
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'election_project.settings')
+
+HOST = '127.0.0.1'
+LOCK_HEADER = 'X-DB-Lock-Errors'
+LOCK_MESSAGES = ('database is locked', 'database table is locked', 'deadlock', 'lock wait timeout',
+                 'could not serialize')
+PARTIES = ('PDP', 'DPP', 'ACN', 'PPA', 'CDC', 'JP', 'ANPP', 'LABO', 'CPP')
+ENDPOINTS = ('lga_page', 'pu_lookup', 'api_wards', 'api_polling_units', 'add_results')
+DEFAULT_MIX = 'lga_page=30,pu_lookup=25,api_wards=15,api_polling_units=15,add_results=15'
+CSRF_INPUT = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+
+def setup_django(database, sqlite_timeout):
+    """Point the project at the load-test database and set Django up."""
+    from django.conf import settings
+
+    settings.DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': str(database),
+        'OPTIONS': {'timeout': sqlite_timeout},
+    }
+    settings.RESULTS_STATE_DATABASES = {}
+    settings.DEBUG = False
+
+    import django
+    django.setup()
+
+
+# =============================================================================
+# Dataset
+# =============================================================================
+
+def generate_dataset(state_id, lgas, wards, polling_units, seed):
+    """Create the schema and one state of LGAs, wards, polling units and results."""
+    from django.core.management import call_command
+    from django.db import connection
+    from django.utils import timezone
+
+    from results import checksums, hierarchy, races, timeline
+    from results.models import AnnouncedLgaResults, AnnouncedPuResults, Lga, Party, PollingUnit, State, Ward
+
+    # Unmanaged tables first: the results migrations add indexes to them
+    with connection.schema_editor() as editor:
+        for model in (State, Lga, Ward, PollingUnit, Party, AnnouncedLgaResults):
+            editor.create_model(model)
+    call_command('migrate', verbosity=0)
+
+    rng = random.Random(seed)
+    now = timezone.now()
+    State.objects.create(state_id=state_id, state_name='Load Test State')
+    Party.objects.bulk_create([Party(partyid=party, partyname=party) for party in PARTIES])
+
+    lga_rows, ward_rows, unit_rows, result_rows = [], [], [], []
+    for lga_id in range(1, lgas + 1):
+        lga_rows.append(Lga(uniqueid=lga_id, lga_id=lga_id, lga_name=f'LGA {lga_id:03d}', state_id=state_id))
+        for ward_id in range(1, wards + 1):
+            ward_uniqueid = len(ward_rows) + 1
+            ward_rows.append(Ward(
+                uniqueid=ward_uniqueid, ward_id=ward_id, ward_name=f'Ward {lga_id}-{ward_id}', lga_id=lga_id,
+            ))
+            for unit_id in range(1, polling_units + 1):
+                uniqueid = len(unit_rows) + 1
+                unit_rows.append(PollingUnit(
+                    uniqueid=uniqueid, polling_unit_id=unit_id, ward_id=ward_id, lga_id=lga_id,
+                    uniquewardid=ward_uniqueid, polling_unit_number=f'LT{lga_id:03d}{ward_id:02d}{unit_id:03d}',
+                    polling_unit_name=f'Polling Unit {lga_id}-{ward_id}-{unit_id}',
+                ))
+                entered = now - timezone.timedelta(minutes=rng.randint(0, 24 * 60))
+                result_rows.extend(
+                    AnnouncedPuResults(
+                        polling_unit_uniqueid=str(uniqueid), party_abbreviation=party,
+                        party_score=rng.randint(0, 500), entered_by_user='loadtest', date_entered=entered,
+                    )
+                    for party in PARTIES
+                )
+
+    for rows in (lga_rows, ward_rows, unit_rows, result_rows):
+        rows[0].__class__.objects.bulk_create(rows, batch_size=1000)
+    hierarchy.rebuild_paths()
+    timeline.rebuild_timeline()
+    races.rebuild_races()
+    checksums.rebuild_checksums()
+
+
+def load_targets(state_id):
+    """Ids the traffic mix picks from: LGAs (with their ward ids) and polling units."""
+    from results.models import Lga, PollingUnitPath, Ward
+
+    lgas = list(Lga.objects.filter(state_id=state_id).values_list('uniqueid', 'lga_id'))
+    ward_ids = defaultdict(list)
+    for lga_id, ward_id in Ward.objects.filter(lga_id__in=[lga_id for _, lga_id in lgas]).values_list(
+        'lga_id', 'ward_id'
+    ):
+        ward_ids[lga_id].append(ward_id)
+    return {
+        'lgas': [(uniqueid, ward_ids[lga_id]) for uniqueid, lga_id in lgas if ward_ids[lga_id]],
+        'polling_units': list(
+            PollingUnitPath.objects.filter(state_id=state_id).values_list('polling_unit_uniqueid', flat=True)
+        ),
+    }
+
+
+# =============================================================================
+# Server (runs in its own process, see --serve)
+# =============================================================================
+
+current_lock_errors = ContextVar('current_lock_errors', default=None)
+
+
+def is_lock_error(error):
+    message = str(error).lower()
+    return any(text in message for text in LOCK_MESSAGES)
+
+
+def record_lock_error(error):
+    errors = current_lock_errors.get()
+    if errors is not None and is_lock_error(error) and not any(seen is error for seen in errors):
+        errors.append(error)
+
+
+def count_lock_errors(execute, sql, params, many, context):
+    """execute_wrapper that notes lock errors, even ones a view goes on to catch."""
+    try:
+        return execute(sql, params, many, context)
+    except Exception as e:
+        record_lock_error(e)
+        raise
+
+
+def install_lock_counter(sender, connection, **kwargs):
+    if count_lock_errors not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_lock_errors)
+
+
+def record_request_exception(sender, request=None, **kwargs):
+    # Lock errors raised outside execute(), e.g. on COMMIT
+    error = sys.exc_info()[1]
+    if error is not None:
+        record_lock_error(error)
+
+
+def count_lock_errors_wsgi(application):
+    """Add the request's lock error count as a response header."""
+    def wrapped(environ, start_response):
+        errors = []
+        token = current_lock_errors.set(errors)
+
+        def start_with_count(status, headers, exc_info=None):
+            return start_response(status, [*headers, (LOCK_HEADER, str(len(errors)))], exc_info)
+
+        try:
+            return application(environ, start_with_count)
+        finally:
+            current_lock_errors.reset(token)
+    return wrapped
+
+
+def count_lock_errors_asgi(application):
+    """ASGI version of count_lock_errors_wsgi()."""
+    async def wrapped(scope, receive, send):
+        if scope['type'] != 'http':
+            return await application(scope, receive, send)
+        errors = []
+        token = current_lock_errors.set(errors)
+
+        async def send_with_count(message):
+            if message['type'] == 'http.response.start':
+                header = (LOCK_HEADER.lower().encode(), str(len(errors)).encode())
+                message = {**message, 'headers': [*message.get('headers', []), header]}
+            await send(message)
+
+        try:
+            await application(scope, receive, send_with_count)
+        finally:
+            current_lock_errors.reset(token)
+    return wrapped
+
+
+def serve_wsgi(port):
+    from socketserver import ThreadingMixIn
+    from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+    from django.core.wsgi import get_wsgi_application
+
+    class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+        daemon_threads = True
+        request_queue_size = 1024
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_message(self, *args):
+            pass
+
+    application = count_lock_errors_wsgi(get_wsgi_application())
+    make_server(HOST, port, application, ThreadingWSGIServer, QuietHandler).serve_forever()
+
+
+def serve_asgi(port):
+    from django.core.asgi import get_asgi_application
+
+    application = count_lock_errors_asgi(get_asgi_application())
+    try:
+        import uvicorn
+    except ImportError:  # optional dependency
+        print('uvicorn is not installed, using the built-in ASGI server.', file=sys.stderr)
+        asyncio.run(serve_asgi_builtin(application, port))
+    else:
+        uvicorn.run(application, host=HOST, port=port, log_level='warning', access_log=False)
+
+
+async def serve_asgi_builtin(application, port):
+    """Just enough HTTP/1.x to run an ASGI app: one request per connection."""
+    async def handle(reader, writer):
+        try:
+            head = await reader.readuntil(b'\r\n\r\n')
+            request_line, *header_lines = head[:-4].decode('latin-1').split('\r\n')
+            method, target, _ = request_line.split(' ', 2)
+            headers = [
+                (name.strip().lower().encode('latin-1'), value.strip().encode('latin-1'))
+                for name, _, value in (line.partition(':') for line in header_lines)
+            ]
+            length = int(dict(headers).get(b'content-length', b'0'))
+            body = await reader.readexactly(length) if length else b''
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            writer.close()
+            return
+
+        path, _, query = target.partition('?')
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': method, 'scheme': 'http', 'path': unquote(path), 'raw_path': path.encode('latin-1'),
+            'query_string': query.encode('latin-1'), 'root_path': '', 'headers': headers,
+            'client': writer.get_extra_info('peername')[:2], 'server': (HOST, port),
+        }
+        finished = asyncio.Event()
+        body_sent = False
+
+        async def receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {'type': 'http.request', 'body': body, 'more_body': False}
+            await finished.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                lines = [f'HTTP/1.1 {status} {HTTPStatus(status).phrase}'.encode('latin-1')]
+                lines += [name + b': ' + value for name, value in message.get('headers', [])]
+                lines.append(b'Connection: close')
+                writer.write(b'\r\n'.join(lines) + b'\r\n\r\n')
+            elif message['type'] == 'http.response.body':
+                writer.write(message.get('body', b''))
+                if not message.get('more_body'):
+                    finished.set()
+            await writer.drain()
+
+        try:
+            await application(scope, receive, send)
+        finally:
+            finished.set()
+            writer.close()
+
+    server = await asyncio.start_server(handle, HOST, port, backlog=1024)
+    async with server:
+        await server.serve_forever()
+
+
+def serve(server, port):
+    from django.core.signals import got_request_exception
+    from django.db.backends.signals import connection_created
+
+    connection_created.connect(install_lock_counter)
+    got_request_exception.connect(record_request_exception)
+    if server == 'asgi':
+        serve_asgi(port)
+    else:
+        serve_wsgi(port)
+
+
+# =============================================================================
+# Clients
+# =============================================================================
+
+class Response:
+    def __init__(self, status, headers, cookies, body):
+        self.status = status
+        self.headers = headers
+        self.cookies = cookies
+        self.body = body
+
+
+async def http_request(port, method, target, headers, body=b'', timeout=30):
+    """One HTTP/1.0 request on a fresh connection; the body runs to EOF."""
+    async def exchange():
+        reader, writer = await asyncio.open_connection(HOST, port)
+        try:
+            lines = [f'{method} {target} HTTP/1.0', f'Host: {HOST}:{port}', 'Connection: close']
+            lines += [f'{name}: {value}' for name, value in headers.items()]
+            if body:
+                lines.append(f'Content-Length: {len(body)}')
+            writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+            await writer.drain()
+            return await reader.read()
+        finally:
+            writer.close()
+
+    raw = await asyncio.wait_for(exchange(), timeout)
+    head, _, content = raw.partition(b'\r\n\r\n')
+    status_line, *header_lines = head.decode('latin-1').split('\r\n')
+    response_headers = {}
+    cookies = {}
+    for line in header_lines:
+        name, _, value = line.partition(':')
+        name, value = name.strip().lower(), value.strip()
+        if name == 'set-cookie':
+            cookie_name, _, cookie_value = value.split(';', 1)[0].partition('=')
+            cookies[cookie_name] = cookie_value
+        else:
+            response_headers[name] = value
+    return Response(int(status_line.split()[1]), response_headers, cookies, content)
+
+
+class VirtualUser:
+    """One simulated browser: keeps its cookies and picks requests from the mix."""
+
+    def __init__(self, port, state_id, targets, rng, timeout):
+        self.port = port
+        self.state_id = state_id
+        self.targets = targets
+        self.rng = rng
+        self.timeout = timeout
+        self.cookies = {}
+        self.csrf_token = None
+        self.sequence = 0
+
+    async def send(self, method, target, data=None):
+        headers = {}
+        body = b''
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{name}={value}' for name, value in self.cookies.items())
+        if data is not None:
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+            body = urlencode(data).encode()
+        response = await http_request(self.port, method, target, headers, body, self.timeout)
+        self.cookies.update(response.cookies)
+        return response
+
+    async def build(self, endpoint):
+        """(method, target, form data, expected statuses) for the next request to endpoint."""
+        lga_uniqueid, ward_ids = self.rng.choice(self.targets['lgas'])
+        state = f'state_id={self.state_id}'
+        if endpoint == 'lga_page':
+            return 'GET', f'/lga-results/?lga_id={lga_uniqueid}&{state}', None, (200,)
+        if endpoint == 'pu_lookup':
+            pu_id = self.rng.choice(self.targets['polling_units'])
+            return 'GET', f'/polling-unit-results/?pu_id={pu_id}&{state}', None, (200,)
+        if endpoint == 'api_wards':
+            return 'GET', f'/api/wards/{lga_uniqueid}/?{state}', None, (200,)
+        if endpoint == 'api_polling_units':
+            return 'GET', f'/api/polling-units/{lga_uniqueid}/?{state}', None, (200,)
+        if endpoint == 'add_results':
+            if self.csrf_token is None:
+                # Not timed: a real user loads the form once, then submits it
+                form = await self.send('GET', f'/add-results/?{state}')
+                match = CSRF_INPUT.search(form.body.decode('utf-8', 'replace'))
+                if match is None:
+                    raise ValueError(f'No CSRF token on the add results form (status {form.status})')
+                self.csrf_token = match.group(1)
+            self.sequence += 1
+            data = {
+                'csrfmiddlewaretoken': self.csrf_token,
+                'state_id': self.state_id,
+                'lga_id': lga_uniqueid,
+                'ward_id': self.rng.choice(ward_ids),
+                'pu_name': f'Load Test PU {id(self) % 10000}-{self.sequence}',
+                'pu_number': f'LOAD{self.sequence:06d}',
+                'entered_by': 'loadtest',
+                **{f'party_{party}': self.rng.randint(0, 500) for party in PARTIES},
+            }
+            # Success is the redirect to the new polling unit; 200 means the form came back with an error
+            return 'POST', '/add-results/', data, (302,)
+        raise ValueError(f'Unknown endpoint {endpoint!r}')
+
+
+class EndpointStats:
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.lock_errors = 0
+        self.statuses = Counter()
+        self.error_samples = []
+
+    def record(self, latency, status=None, error=None, lock_errors=0):
+        self.latencies.append(latency)
+        self.statuses[str(status) if status is not None else 'transport_error'] += 1
+        self.lock_errors += lock_errors
+        if error:
+            self.errors += 1
+            if len(self.error_samples) < 5:
+                self.error_samples.append(error)
+
+    def merge(self, other):
+        self.latencies += other.latencies
+        self.errors += other.errors
+        self.lock_errors += other.lock_errors
+        self.statuses.update(other.statuses)
+        self.error_samples += other.error_samples[:5 - len(self.error_samples)]
+
+    def summary(self, duration):
+        latencies = sorted(self.latencies)
+        count = len(latencies)
+        return {
+            'requests': count,
+            'throughput_rps': round(count / duration, 2) if duration else None,
+            'errors': self.errors,
+            'error_rate': round(self.errors / count, 4) if count else 0.0,
+            'db_lock_errors': self.lock_errors,
+            'latency_ms': {
+                'mean': round(sum(latencies) / count * 1000, 2) if count else None,
+                'p50': percentile_ms(latencies, 50),
+                'p95': percentile_ms(latencies, 95),
+                'p99': percentile_ms(latencies, 99),
+                'max': round(latencies[-1] * 1000, 2) if count else None,
+            },
+            'status_codes': dict(sorted(self.statuses.items())),
+            'error_samples': self.error_samples,
+        }
+
+
+def percentile_ms(sorted_latencies, pct):
+    """Nearest-rank percentile of sorted latencies (seconds), in milliseconds."""
+    if not sorted_latencies:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_latencies)))
+    return round(sorted_latencies[rank - 1] * 1000, 2)
+
+
+async def run_load(port, state_id, targets, mix, concurrency, duration, warmup, timeout, seed):
+    """Run the virtual users; only requests started after the warm-up are recorded."""
+    stats = defaultdict(EndpointStats)
+    endpoints, weights = zip(*mix.items())
+    measure_from = time.monotonic() + warmup
+    stop_at = measure_from + duration
+
+    async def worker(number):
+        rng = random.Random(seed + number)
+        user = VirtualUser(port, state_id, targets, rng, timeout)
+        while time.monotonic() < stop_at:
+            endpoint = rng.choices(endpoints, weights)[0]
+            recorded = time.monotonic() >= measure_from
+            started = time.perf_counter()
+            try:
+                method, target, data, expected = await user.build(endpoint)
+                started = time.perf_counter()
+                response = await user.send(method, target, data)
+            except (OSError, ValueError, asyncio.TimeoutError) as e:
+                if recorded:
+                    stats[endpoint].record(time.perf_counter() - started, error=f'{type(e).__name__}: {e}')
+                await asyncio.sleep(0.05)
+                continue
+            latency = time.perf_counter() - started
+            if recorded:
+                error = None if response.status in expected else f'{method} {target} -> {response.status}'
+                lock_errors = int(response.headers.get(LOCK_HEADER.lower(), 0))
+                stats[endpoint].record(latency, response.status, error, lock_errors)
+
+    await asyncio.gather(*(worker(number) for number in range(concurrency)))
+    return stats
+
+
+# =============================================================================
+# Running it all
+# =============================================================================
+
+def parse_mix(value):
+    mix = {}
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f'unknown endpoint {name!r}')
+        try:
+            mix[name] = float(weight) if weight else 1.0
+        except ValueError:
+            raise argparse.ArgumentTypeError(f'bad weight for {name!r}: {weight!r}')
+    if not any(mix.values()):
+        raise argparse.ArgumentTypeError('the mix needs at least one positive weight')
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+def start_server(args, database, port):
+    """Start the server process and wait until it answers."""
+    command = [
+        sys.executable, __file__, '--serve', '--server', args.server, '--database', str(database),
+        '--port', str(port), '--sqlite-timeout', str(args.sqlite_timeout),
+    ]
+    process = subprocess.Popen(command, cwd=PROJECT_DIR, stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f'The {args.server} server exited with code {process.returncode}.')
+        try:
+            asyncio.run(http_request(port, 'GET', '/', {}, timeout=5))
+            return process
+        except (OSError, asyncio.TimeoutError):
+            time.sleep(0.2)
+    process.kill()
+    raise SystemExit(f'The {args.server} server did not start within 60 seconds.')
+
+
+def print_summary(report):
+    print(f"\n{'endpoint':<20}{'requests':>9}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'errors':>8}{'locks':>7}")
+    rows = [*report['endpoints'].items(), ('total', report['totals'])]
+    for name, summary in rows:
+        latency = summary['latency_ms']
+        print(f"{name:<20}{summary['requests']:>9}{summary['throughput_rps'] or 0:>9.1f}"
+              f"{latency['p50'] or 0:>9.1f}{latency['p95'] or 0:>9.1f}{latency['p99'] or 0:>9.1f}"
+              f"{summary['errors']:>8}{summary['db_lock_errors']:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--server', choices=('wsgi', 'asgi'), default='wsgi')
+    parser.add_argument('--concurrency', type=int, default=20, help='virtual users (default: %(default)s)')
+    parser.add_argument('--duration', type=float, default=30, help='measured seconds (default: %(default)s)')
+    parser.add_argument('--warmup', type=float, default=5, help='unrecorded seconds first (default: %(default)s)')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f'endpoint=weight list (default: {DEFAULT_MIX})')
+    parser.add_argument('--timeout', type=float, default=30, help='per-request timeout in seconds')
+    parser.add_argument('--report', default='loadtest-report.json', help='JSON report path (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=1)
+    dataset = parser.add_argument_group('dataset')
+    dataset.add_argument('--database', help='reuse this SQLite file instead of generating a new dataset')
+    dataset.add_argument('--state-id', type=int, default=25)
+    dataset.add_argument('--lgas', type=int, default=20)
+    dataset.add_argument('--wards', type=int, default=10, help='wards per LGA')
+    dataset.add_argument('--polling-units', type=int, default=10, help='polling units per ward')
+    dataset.add_argument('--sqlite-timeout', type=float, default=5, help='seconds SQLite waits on a lock')
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        setup_django(args.database, args.sqlite_timeout)
+        serve(args.server, args.port)
+        return
+
+    if args.database:
+        database = Path(args.database)
+        setup_django(database, args.sqlite_timeout)
+    else:
+        database = Path(tempfile.mkdtemp(prefix='loadtest-')) / 'loadtest.sqlite3'
+        setup_django(database, args.sqlite_timeout)
+        print(f'Generating dataset in {database} ...')
+        generate_dataset(args.state_id, args.lgas, args.wards, args.polling_units, args.seed)
+    targets = load_targets(args.state_id)
+    if not targets['lgas'] or not targets['polling_units']:
+        raise SystemExit(f'No LGAs or polling units for state {args.state_id} in {database}.')
+
+    from django.db import connections
+    from django.utils import timezone
+    connections.close_all()
+
+    port = free_port()
+    process = start_server(args, database, port)
+    print(f'{args.server} server on port {port}: {args.concurrency} users, '
+          f'{args.warmup:g}s warm-up + {args.duration:g}s measured ...')
+    started_at = timezone.now()
+    try:
+        stats = asyncio.run(run_load(
+            port, args.state_id, targets, args.mix, args.concurrency, args.duration, args.warmup,
+            args.timeout, args.seed,
+        ))
+    finally:
+        process.terminate()
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+    totals = EndpointStats()
+    for endpoint_stats in stats.values():
+        totals.merge(endpoint_stats)
+    report = {
+        'started_at': started_at.isoformat(),
+        'server': args.server,
+        'concurrency': args.concurrency,
+        'duration_s': args.duration,
+        'warmup_s': args.warmup,
+        'mix': args.mix,
+        'dataset': {
+            'database': str(database),
+            'state_id': args.state_id,
+            'lgas': len(targets['lgas']),
+            'polling_units': len(targets['polling_units']),
+        },
+        'totals': totals.summary(args.duration),
+        'endpoints': {name: stats[name].summary(args.duration) for name in args.mix if name in stats},
+    }
+    Path(args.report).write_text(json.dumps(report, indent=2), encoding='utf-8')
+    print_summary(report)
+    print(f'\nReport written to {args.report}')
+
+
+if __name__ == '__main__':
+    main()
@@ -28,12 +28,14 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'results.middleware.RequestProfilerMiddleware',  # opt-in, see results/profiling.py
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'results.middleware.StatePartitionMiddleware',  # picks the state (and its database) per request
 ]
 
 ROOT_URLCONF = 'election_project.urls'
@@ -49,6 +51,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'results.context_processors.current_state',
             ],
         },
     },
@@ -65,6 +68,14 @@ DATABASES = {
     }
 }
 
+# Multi-state support (see results/partitions.py)
+# States listed in RESULTS_STATE_DATABASES keep their results data in their own
+# database, e.g. {25: 'delta'} with DATABASES['delta'] pointing at delta.sqlite3.
+# Everything else uses 'default'.
+DATABASE_ROUTERS = ['results.partitions.StatePartitionRouter']
+RESULTS_DEFAULT_STATE_ID = 25  # Delta
+RESULTS_STATE_DATABASES = {}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -94,3 +105,24 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Results timeline: size of the time buckets used for "results as of T"
+RESULTS_TIMELINE_BUCKET_SECONDS = 300
+
+# Batched polling unit results API: maximum ids per request
+RESULTS_BATCH_MAX_POLLING_UNITS = 100
+
+# Cross-state party totals API: maximum states per request (36 states and the FCT)
+RESULTS_PARTY_TOTALS_MAX_STATES = 37
+
+# Request profiler (see results/profiling.py)
+# Requests with a valid X-Profile-Token header are always profiled; set a
+# sample rate between 0 and 1 to also profile a share of normal traffic.
+RESULTS_PROFILE_SAMPLE_RATE = 0.0
+RESULTS_PROFILE_SLOW_QUERY_MS = 100
+RESULTS_PROFILE_DIR = BASE_DIR / 'profiles'
+RESULTS_PROFILE_MAX_CAPTURES = 50
+
+# API JSON responses (see results/responses.py)
+RESULTS_JSON_GZIP_MIN_BYTES = 1024  # gzip bodies at least this big
+RESULTS_JSON_STREAM_MIN_ROWS = 5000  # stream row lists at least this long
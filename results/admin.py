@@ -0,0 +1,246 @@
+"""
+Django Admin for Election Results
+=================================
+Admin registrations for the results and hierarchy tables.
+
+announced_pu_results can grow to millions of rows, so the changelists here
+avoid the usual admin costs:
+- no exact COUNT(*) over the whole table (see EstimatedCountPaginator)
+- filters only on indexed columns (see migrations/0002), with choices taken
+  from the small lookup tables rather than SELECT DISTINCT over the results
+- search is an exact match on an indexed column
+- LGA/Ward names are resolved with correlated subqueries, which the database
+  only evaluates for the rows on the current page (no N+1 queries)
+"""
+
+from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import OperationalError, ProgrammingError, connections
+from django.db.models import IntegerField, OuterRef, Subquery
+from django.db.models.functions import Cast
+from django.utils.functional import cached_property
+
+from .models import (
+    AnnouncedLgaResults, AnnouncedPuResults, Lga, Party, PollingUnit, PollingUnitPath, Ward, WardPath,
+)
+
+
+# =============================================================================
+# Estimated counts
+# =============================================================================
+
+# Filtered changelists are counted exactly, but never past this many rows
+FILTERED_COUNT_LIMIT = 10000
+
+
+def estimate_row_count(model, using='default'):
+    """
+    Cheap estimate of the number of rows in a model's table.
+
+    Uses the planner statistics where the database keeps them (pg_class on
+    PostgreSQL, sqlite_stat1 after ANALYZE on SQLite), otherwise MAX(pk),
+    which is a single index lookup. Returns None if no estimate is available.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    pk_column = model._meta.pk.column
+    queries = []
+
+    if connection.vendor == 'postgresql':
+        queries.append(('SELECT reltuples::bigint FROM pg_class WHERE relname = %s', [table]))
+    elif connection.vendor == 'sqlite':
+        queries.append(('SELECT CAST(stat AS INTEGER) FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table]))
+    queries.append((f'SELECT MAX({connection.ops.quote_name(pk_column)}) FROM {connection.ops.quote_name(table)}', []))
+
+    for sql, params in queries:
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params)
+                row = cursor.fetchone()
+        except (OperationalError, ProgrammingError):
+            # e.g. sqlite_stat1 does not exist until ANALYZE has been run
+            continue
+        if row and row[0] is not None and row[0] > 0:
+            return int(row[0])
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that never runs an unbounded COUNT(*).
+
+    Unfiltered querysets use estimate_row_count(); filtered ones are counted
+    exactly up to FILTERED_COUNT_LIMIT rows.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimate_row_count(queryset.model, using=queryset.db)
+            if estimate is not None:
+                return estimate
+        # values('pk') drops the name annotations from the COUNT subquery
+        return queryset.order_by().values('pk')[:FILTERED_COUNT_LIMIT].count()
+
+
+class ScalableModelAdmin(admin.ModelAdmin):
+    """Base admin for the large tables - estimated counts, no 'show all'."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+    list_max_show_all = 0
+
+
+# =============================================================================
+# Filters and search
+# =============================================================================
+
+class PartyListFilter(admin.SimpleListFilter):
+    """
+    Filter on party_abbreviation, with the choices read from the party table
+    (the default filter runs SELECT DISTINCT over every result row).
+    """
+    title = 'party'
+    parameter_name = 'party_abbreviation'
+
+    def lookups(self, request, model_admin):
+        return [(party.partyid, party.partyname) for party in Party.objects.order_by('partyname')]
+
+    def queryset(self, request, queryset):
+        if self.value() is None:
+            return queryset
+        # party_abbreviation holds 4 characters, so older rows have e.g. LABO for LABOUR
+        return queryset.filter(party_abbreviation__in={self.value(), self.value()[:4]})
+
+
+class ExactSearchMixin:
+    """
+    Search by exact match on indexed columns. Django's '=' prefix is iexact,
+    which SQLite runs as LIKE and cannot answer from an index.
+
+    exact_search_fields maps each field to a function that converts the search
+    term (raising ValueError if it does not apply to that field).
+    """
+    exact_search_fields = {}
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        matches = queryset.none()
+        for field, convert in self.exact_search_fields.items():
+            try:
+                value = convert(term)
+            except ValueError:
+                continue
+            matches = matches | queryset.filter(**{field: value})
+        return matches, False
+
+
+# =============================================================================
+# Subqueries used to show hierarchy names without joins or N+1 queries
+# =============================================================================
+
+def name_through_path(paths, uniqueid_field, model, name_field):
+    """Name of the LGA or ward a path row points to (paths is filtered on the outer query)."""
+    names = model.objects.filter(uniqueid=OuterRef(uniqueid_field)).values(name_field)[:1]
+    return Subquery(paths.annotate(_name=Subquery(names)).values('_name')[:1])
+
+
+def lga_name_subquery(paths):
+    """LGA name from a polling unit or ward path (lga_id alone is only unique per state)."""
+    return name_through_path(paths, 'lga_uniqueid', Lga, 'lga_name')
+
+
+def ward_name_subquery(paths):
+    """Ward name from a polling unit path."""
+    return name_through_path(paths, 'ward_uniqueid', Ward, 'ward_name')
+
+
+# =============================================================================
+# Admin registrations
+# =============================================================================
+
+@admin.register(AnnouncedPuResults)
+class AnnouncedPuResultsAdmin(ExactSearchMixin, ScalableModelAdmin):
+    list_display = ('result_id', 'polling_unit_uniqueid', 'pu_name', 'lga_name', 'ward_name',
+                    'party_abbreviation', 'party_score', 'date_entered')
+    list_filter = (PartyListFilter,)
+    search_fields = ('polling_unit_uniqueid',)
+    exact_search_fields = {'polling_unit_uniqueid': str}
+
+    def get_queryset(self, request):
+        polling_unit = PollingUnit.objects.filter(
+            uniqueid=Cast(OuterRef('polling_unit_uniqueid'), IntegerField())
+        )
+        path = PollingUnitPath.objects.filter(result_key=OuterRef('polling_unit_uniqueid'))
+        return super().get_queryset(request).annotate(
+            _pu_name=Subquery(polling_unit.values('polling_unit_name')[:1]),
+            _lga_name=lga_name_subquery(path),
+            _ward_name=ward_name_subquery(path),
+        )
+
+    @admin.display(description='Polling Unit')
+    def pu_name(self, obj):
+        return obj._pu_name
+
+    @admin.display(description='LGA')
+    def lga_name(self, obj):
+        return obj._lga_name
+
+    @admin.display(description='Ward')
+    def ward_name(self, obj):
+        return obj._ward_name
+
+
+@admin.register(PollingUnit)
+class PollingUnitAdmin(ExactSearchMixin, ScalableModelAdmin):
+    list_display = ('uniqueid', 'polling_unit_name', 'polling_unit_number', 'lga_name', 'ward_name')
+    list_filter = ('lga_id',)
+    search_fields = ('uniqueid', 'polling_unit_number')
+    exact_search_fields = {'uniqueid': int, 'polling_unit_number': str}
+
+    def get_queryset(self, request):
+        path = PollingUnitPath.objects.filter(polling_unit_uniqueid=OuterRef('uniqueid'))
+        return super().get_queryset(request).annotate(
+            _lga_name=lga_name_subquery(path),
+            _ward_name=ward_name_subquery(path),
+        )
+
+    @admin.display(description='LGA')
+    def lga_name(self, obj):
+        return obj._lga_name
+
+    @admin.display(description='Ward')
+    def ward_name(self, obj):
+        return obj._ward_name
+
+
+@admin.register(Ward)
+class WardAdmin(ScalableModelAdmin):
+    list_display = ('uniqueid', 'ward_id', 'ward_name', 'lga_name')
+    list_filter = ('lga_id',)
+    search_fields = ('ward_name',)
+
+    def get_queryset(self, request):
+        path = WardPath.objects.filter(ward_uniqueid=OuterRef('uniqueid'))
+        return super().get_queryset(request).annotate(_lga_name=lga_name_subquery(path))
+
+    @admin.display(description='LGA')
+    def lga_name(self, obj):
+        return obj._lga_name
+
+
+@admin.register(Lga)
+class LgaAdmin(admin.ModelAdmin):
+    list_display = ('uniqueid', 'lga_id', 'lga_name', 'state_id')
+    list_filter = ('state_id',)
+    search_fields = ('lga_name',)
+
+
+@admin.register(AnnouncedLgaResults)
+class AnnouncedLgaResultsAdmin(ScalableModelAdmin):
+    list_display = ('result_id', 'lga_name', 'party_abbreviation', 'party_score', 'date_entered')
+    list_filter = (PartyListFilter,)
+    search_fields = ('=lga_name',)
@@ -1,4 +1,7 @@
 from django.apps import AppConfig
 
 class ResultsConfig(AppConfig):
-    name = 'results'
\ No newline at end of file
+    name = 'results'
+
+    def ready(self):
+        from . import signals  # noqa: F401 - registers the signal handlers
@@ -0,0 +1,402 @@
+"""
+Result Checksums
+================
+A Merkle-style checksum tree over the party scores:
+
+    state -> LGA -> ward -> polling unit
+
+A polling unit's digest is the SHA-256 of its (party, score) rows. Every other
+node's digest is the SHA-256 of its children's keys and digests, so the state
+root changes whenever any score in the state changes or a polling unit moves.
+Polling units without a ward hang directly off their LGA.
+
+Digests are updated with every result write, or once per batch (see upkeep.py):
+each changed polling unit is rehashed from its own rows and each ancestor,
+once, from its children's stored digests - announced_pu_results is never
+re-read as a whole.
+
+audit_tree() compares two trees from the state root down and only descends
+into children whose digests differ, so identical trees cost one comparison.
+
+Writes that bypass the app (raw SQL, queryset.update()) do not touch the tree,
+so comparing trees cannot see them. On SQLite, triggers on
+announced_pu_results count every write per polling unit in result_write_log
+and the app counts its own (see upkeep.py). get_outside_writes() lists the
+polling units whose counts differ.
+Run `python manage.py audit_result_checksums` to save snapshots and audit,
+and `python manage.py rebuild_result_checksums` to rebuild the tree.
+"""
+
+import hashlib
+from collections import defaultdict
+
+from django.db import connections, router, transaction
+from django.db.models import Case, F, IntegerField, Value, When
+
+from .models import AnnouncedPuResults, PollingUnitPath, ResultChecksum, ResultWriteLog
+
+
+LEVELS = ('pu', 'ward', 'lga', 'state')
+
+
+def sha256(lines):
+    return hashlib.sha256('\n'.join(lines).encode('utf-8')).hexdigest()
+
+
+def leaf_digest(polling_unit_uniqueid, scores):
+    """Digest of one polling unit from its (party, score) rows."""
+    return sha256([f'pu:{polling_unit_uniqueid}', *sorted(f'{party}:{score}' for party, score in scores)])
+
+
+def node_digest(level, area_uniqueid, children):
+    """Digest of a ward, LGA or state from its children's (level, area_uniqueid, digest)."""
+    return sha256([
+        f'{level}:{area_uniqueid}',
+        *(f'{child_level}:{child_uniqueid}:{digest}' for child_level, child_uniqueid, digest in sorted(children)),
+    ])
+
+
+def get_ancestors(path):
+    """[(node, parent)] from a polling unit up to its state; parent is None for the root."""
+    state = ('state', path.state_id)
+    lga = ('lga', path.lga_uniqueid)
+    pu = ('pu', path.polling_unit_uniqueid)
+    if path.ward_uniqueid is None:
+        return [(pu, lga), (lga, state), (state, None)]
+    ward = ('ward', path.ward_uniqueid)
+    return [(pu, ward), (ward, lga), (lga, state), (state, None)]
+
+
+def get_digest(level, area_uniqueid):
+    """Stored digest of one node, or None."""
+    return (
+        ResultChecksum.objects
+        .filter(level=level, area_uniqueid=area_uniqueid)
+        .values_list('digest', flat=True)
+        .first()
+    )
+
+
+# =============================================================================
+# Incremental maintenance
+# =============================================================================
+
+def get_stored_ancestors(node):
+    """[(node, parent)] following the stored parent links up from node."""
+    chain = []
+    while node is not None:
+        row = (
+            ResultChecksum.objects
+            .filter(level=node[0], area_uniqueid=node[1])
+            .values_list('parent_level', 'parent_uniqueid')
+            .first()
+        )
+        if row is None:
+            break
+        parent = row if row[0] is not None else None
+        chain.append((node, parent))
+        node = parent
+    return chain
+
+
+def set_node(node, parent, state_id, digest):
+    values = {
+        'parent_level': parent[0] if parent else None,
+        'parent_uniqueid': parent[1] if parent else None,
+        'state_id': state_id,
+        'digest': digest,
+    }
+    if not ResultChecksum.objects.filter(level=node[0], area_uniqueid=node[1]).update(**values):
+        ResultChecksum.objects.create(level=node[0], area_uniqueid=node[1], **values)
+
+
+def refresh_node(node, parent, state_id):
+    """Rehash a ward, LGA or state from its children, or drop it if it has none."""
+    children = list(
+        ResultChecksum.objects
+        .filter(parent_level=node[0], parent_uniqueid=node[1])
+        .values_list('level', 'area_uniqueid', 'digest')
+    )
+    if not children:
+        ResultChecksum.objects.filter(level=node[0], area_uniqueid=node[1]).delete()
+        return
+    set_node(node, parent, state_id, node_digest(*node, children))
+
+
+def lock_roots(state_ids):
+    """
+    Take the state root rows, so concurrent writes in one state queue up here
+    instead of rehashing shared ancestors from each other's stale reads.
+    """
+    if state_ids:
+        ResultChecksum.objects.filter(level='state', area_uniqueid__in=sorted(state_ids)).update(digest=F('digest'))
+
+
+def update_polling_units(result_keys):
+    """
+    Rehash polling units and their ancestors, each ancestor once. Call after
+    any change to their results or their place in the hierarchy.
+    """
+    result_keys = {str(key) for key in result_keys}
+    if not result_keys:
+        return
+    paths = {path.result_key: path for path in PollingUnitPath.objects.filter(result_key__in=result_keys)}
+    scores = defaultdict(list)
+    rows = (
+        AnnouncedPuResults.objects
+        .filter(polling_unit_uniqueid__in=paths)
+        .values_list('polling_unit_uniqueid', 'party_abbreviation', 'party_score')
+    )
+    for result_key, party, score in rows:
+        scores[result_key].append((party, score))
+    uniqueids = {
+        result_key: paths[result_key].polling_unit_uniqueid if result_key in paths else int(result_key)
+        for result_key in result_keys
+        if result_key in paths or result_key.isdigit()
+    }
+    stored_parents = {
+        area_uniqueid: (parent_level, parent_uniqueid)
+        for area_uniqueid, parent_level, parent_uniqueid in ResultChecksum.objects
+        .filter(level='pu', area_uniqueid__in=uniqueids.values())
+        .values_list('area_uniqueid', 'parent_level', 'parent_uniqueid')
+    }
+
+    leaves = {}  # leaf -> (parent, state_id, digest), or None to delete it
+    state_ids = {}
+    parents = {}
+    for result_key, uniqueid in uniqueids.items():
+        leaf = ('pu', uniqueid)
+        path = paths.get(result_key)
+        new_chain = get_ancestors(path) if path is not None and scores[result_key] else []
+        stored_parent = stored_parents.get(uniqueid)
+        if stored_parent is None and not new_chain:
+            continue
+        old_chain = []
+        if stored_parent is not None and (not new_chain or stored_parent != new_chain[0][1]):
+            old_chain = get_stored_ancestors(leaf)
+        if new_chain:
+            leaves[leaf] = (new_chain[0][1], path.state_id, leaf_digest(uniqueid, scores[result_key]))
+        else:
+            leaves[leaf] = None
+        # Nodes to rehash: the new path, plus the old one if the polling unit moved
+        for chain in (old_chain, new_chain):
+            for node, parent in chain[1:]:
+                state_ids[node] = chain[-1][0][1]
+                parents[node] = parent
+    if not leaves:
+        return
+
+    with transaction.atomic(using=router.db_for_write(ResultChecksum)):
+        lock_roots({node[1] for node in parents if node[0] == 'state'})
+        for leaf, values in leaves.items():
+            if values is None:
+                ResultChecksum.objects.filter(level=leaf[0], area_uniqueid=leaf[1]).delete()
+            else:
+                set_node(leaf, *values)
+        for node in sorted(parents, key=lambda node: LEVELS.index(node[0])):
+            refresh_node(node, parents[node], state_ids[node])
+
+
+# =============================================================================
+# Full computation
+# =============================================================================
+
+def compute_tree(state_id=None, connection=None):
+    """
+    Every node of the tree (of one state, or all) computed from
+    announced_pu_results: {(level, area_uniqueid): (parent, state_id, digest)}.
+    Reads from the results partition unless a connection is given.
+    """
+    sql = '''
+        SELECT p.polling_unit_uniqueid, p.state_id, p.lga_uniqueid, p.ward_uniqueid,
+               apr.party_abbreviation, apr.party_score
+        FROM polling_unit_path p
+        JOIN announced_pu_results apr ON apr.polling_unit_uniqueid = p.result_key
+    '''
+    params = []
+    if state_id is not None:
+        sql += ' WHERE p.state_id = %s'
+        params.append(state_id)
+
+    scores = defaultdict(list)
+    paths = {}
+    if connection is None:
+        connection = connections[router.db_for_read(ResultChecksum)]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        for uniqueid, pu_state_id, lga_uniqueid, ward_uniqueid, party, score in cursor.fetchall():
+            scores[uniqueid].append((party, score))
+            paths[uniqueid] = PollingUnitPath(
+                polling_unit_uniqueid=uniqueid, state_id=pu_state_id,
+                lga_uniqueid=lga_uniqueid, ward_uniqueid=ward_uniqueid,
+            )
+
+    nodes = {}
+    children = defaultdict(list)
+    for uniqueid, path in paths.items():
+        ancestors = get_ancestors(path)
+        digest = leaf_digest(uniqueid, scores[uniqueid])
+        nodes[ancestors[0][0]] = (ancestors[0][1], path.state_id, digest)
+        children[ancestors[0][1]].append((*ancestors[0][0], digest))
+        for node, parent in ancestors[1:]:
+            nodes.setdefault(node, (parent, path.state_id, None))
+
+    # Bottom-up: wards, then LGAs, then states
+    for level in LEVELS[1:]:
+        for node, (parent, node_state_id, _) in list(nodes.items()):
+            if node[0] == level:
+                digest = node_digest(*node, children[node])
+                nodes[node] = (parent, node_state_id, digest)
+                if parent is not None:
+                    children[parent].append((*node, digest))
+    return nodes
+
+
+def rebuild_checksums():
+    """Recompute the whole checksum tree. Returns the number of nodes."""
+    checksums = [
+        ResultChecksum(
+            level=level, area_uniqueid=area_uniqueid, state_id=state_id, digest=digest,
+            parent_level=parent[0] if parent else None, parent_uniqueid=parent[1] if parent else None,
+        )
+        for (level, area_uniqueid), (parent, state_id, digest) in compute_tree().items()
+    ]
+    with transaction.atomic(using=router.db_for_write(ResultChecksum)):
+        ResultChecksum.objects.all().delete()
+        ResultChecksum.objects.bulk_create(checksums, batch_size=1000)
+        # The tree now matches the rows, whoever wrote them
+        ResultWriteLog.objects.all().delete()
+    return len(checksums)
+
+
+# =============================================================================
+# Auditing
+# =============================================================================
+
+class StoredTree:
+    """The tree in result_checksums, read one node's children at a time."""
+
+    def digest(self, node):
+        return get_digest(*node)
+
+    def children(self, node):
+        rows = (
+            ResultChecksum.objects
+            .filter(parent_level=node[0], parent_uniqueid=node[1])
+            .values_list('level', 'area_uniqueid', 'digest')
+        )
+        return {(level, area_uniqueid): digest for level, area_uniqueid, digest in rows}
+
+
+class MemoryTree:
+    """A tree held in memory: a saved snapshot or the output of compute_tree()."""
+
+    def __init__(self, nodes):
+        self.digests = {}
+        self.child_digests = defaultdict(dict)
+        for node, (parent, _, digest) in nodes.items():
+            self.digests[node] = digest
+            if parent is not None:
+                self.child_digests[parent][node] = digest
+
+    def digest(self, node):
+        return self.digests.get(node)
+
+    def children(self, node):
+        return self.child_digests.get(node, {})
+
+
+def snapshot(state_id):
+    """The stored tree of one state, as nodes for MemoryTree (and JSON)."""
+    rows = ResultChecksum.objects.filter(state_id=state_id).values_list(
+        'level', 'area_uniqueid', 'parent_level', 'parent_uniqueid', 'digest'
+    )
+    return {
+        (level, area_uniqueid): ((parent_level, parent_uniqueid) if parent_level else None, state_id, digest)
+        for level, area_uniqueid, parent_level, parent_uniqueid, digest in rows
+    }
+
+
+def audit_tree(expected, actual, state_id):
+    """
+    Compare two trees from the state root down, descending only into children
+    whose digests differ.
+
+    Returns (differences, compared): the lowest differing nodes as
+    (node, expected_digest, actual_digest), and how many nodes were compared.
+    A digest of None means the node is missing from that tree.
+    """
+    root = ('state', state_id)
+    compared = 1
+    if expected.digest(root) == actual.digest(root):
+        return [], compared
+
+    differences = []
+    pending = [root]
+    while pending:
+        node = pending.pop()
+        expected_children = expected.children(node)
+        actual_children = actual.children(node)
+        keys = sorted(set(expected_children) | set(actual_children))
+        compared += len(keys)
+        mismatched = [key for key in keys if expected_children.get(key) != actual_children.get(key)]
+        if not mismatched:
+            # Same children, different digest: the node's own digest is wrong
+            differences.append((node, expected.digest(node), actual.digest(node)))
+        for key in mismatched:
+            if key[0] == 'pu' or key not in expected_children or key not in actual_children:
+                differences.append((key, expected_children.get(key), actual_children.get(key)))
+            else:
+                pending.append(key)
+    return differences, compared
+
+
+def verify_polling_unit(polling_unit_uniqueid):
+    """Whether a polling unit's stored digest still matches its result rows."""
+    path = PollingUnitPath.objects.filter(polling_unit_uniqueid=polling_unit_uniqueid).first()
+    scores = list(
+        AnnouncedPuResults.objects
+        .filter(polling_unit_uniqueid=str(polling_unit_uniqueid))
+        .values_list('party_abbreviation', 'party_score')
+    )
+    stored = get_digest('pu', polling_unit_uniqueid)
+    if path is None or not scores:
+        return stored is None
+    return stored == leaf_digest(polling_unit_uniqueid, scores)
+
+
+# =============================================================================
+# Writes made around the app
+# =============================================================================
+
+def record_app_writes(counts):
+    """
+    Add {result_key: writes} made through the app to result_write_log, and
+    drop the polling units whose counts now balance.
+    """
+    counts = {key: count for key, count in counts.items() if count}
+    if not counts:
+        return
+    # No row means the log was cleared by a rebuild since: nothing to balance
+    ResultWriteLog.objects.filter(polling_unit_key__in=counts).update(app_writes=F('app_writes') + Case(
+        *[When(polling_unit_key=key, then=Value(count)) for key, count in counts.items()],
+        output_field=IntegerField(),
+    ))
+    ResultWriteLog.objects.filter(polling_unit_key__in=counts, writes=F('app_writes')).delete()
+
+
+def get_outside_writes(state_id):
+    """
+    {result_key: (writes, app_writes)} for the polling units of a state (or
+    without a path) that were written around the app since the last rebuild.
+    """
+    log = {
+        key: (writes, app_writes)
+        for key, writes, app_writes in ResultWriteLog.objects
+        .exclude(writes=F('app_writes'))
+        .values_list('polling_unit_key', 'writes', 'app_writes')
+    }
+    path_states = dict(
+        PollingUnitPath.objects.filter(result_key__in=log).values_list('result_key', 'state_id')
+    )
+    return {key: counts for key, counts in log.items() if path_states.get(key, state_id) == state_id}
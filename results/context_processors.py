@@ -0,0 +1,18 @@
+"""
+Template context processors for the results app.
+"""
+
+from .models import State
+from .partitions import get_current_state_id
+
+
+def current_state(request):
+    """The state being viewed and the list of states, for the header and state picker."""
+    state_id = getattr(request, 'state_id', None) or get_current_state_id()
+    states = list(State.objects.order_by('state_name'))
+    current = next((s for s in states if s.state_id == state_id), None)
+    return {
+        'states': states,
+        'current_state_id': state_id,
+        'current_state': current,
+    }
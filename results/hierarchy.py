@@ -0,0 +1,220 @@
+"""
+Polling Unit Paths
+==================
+The hierarchy tables only link to each other through plain integers:
+polling_unit.lga_id matches lga.lga_id, and a ward is identified by
+(lga_id, ward_id). lga_id is only unique within a state, so those joins are
+ambiguous as soon as more than one state is loaded.
+
+polling_unit_path resolves this once per polling unit and stores the
+uniqueids of its state, LGA and ward; ward_path does the same for wards.
+Views join on them instead:
+
+    polling_unit_path p
+    JOIN lga l ON l.uniqueid = p.lga_uniqueid
+    JOIN announced_pu_results apr ON apr.polling_unit_uniqueid = p.result_key
+
+Paths are written when a polling unit or ward is saved (see signals.py). Run
+`python manage.py rebuild_polling_unit_paths` after loading data with raw SQL.
+"""
+
+from django.db import router, transaction
+
+from .models import Lga, PollingUnit, PollingUnitPath, Ward, WardPath
+from .partitions import get_current_state_id
+
+
+def resolve_lgas(lgas, state_id=None):
+    """
+    {lga_id: (lga_uniqueid, state_id)} from (uniqueid, lga_id, state_id)
+    tuples. Where an lga_id exists in several states, the LGA in `state_id` wins.
+    """
+    lga_by_id = {}
+    for uniqueid, lga_id, lga_state_id in lgas:
+        if lga_id not in lga_by_id or lga_state_id == state_id:
+            lga_by_id[lga_id] = (uniqueid, lga_state_id)
+    return lga_by_id
+
+
+def compute_ward_paths(lgas, wards, state_id=None):
+    """
+    Work out the LGA of every ward.
+
+    lgas:  (uniqueid, lga_id, state_id) tuples
+    wards: (uniqueid, lga_id) tuples
+
+    Yields (ward_uniqueid, state_id, lga_uniqueid); wards whose LGA cannot
+    be found are skipped.
+    """
+    lga_by_id = resolve_lgas(lgas, state_id)
+    for uniqueid, lga_id in wards:
+        if lga_id in lga_by_id:
+            lga_uniqueid, lga_state_id = lga_by_id[lga_id]
+            yield uniqueid, lga_state_id, lga_uniqueid
+
+
+def compute_paths(lgas, wards, units, state_id=None):
+    """
+    Work out the path of every polling unit.
+
+    lgas:  (uniqueid, lga_id, state_id) tuples
+    wards: (uniqueid, lga_id, ward_id) tuples
+    units: (uniqueid, lga_id, ward_id, uniquewardid) tuples
+
+    Where an lga_id exists in several states, the LGA in `state_id` wins.
+    Yields (polling_unit_uniqueid, state_id, lga_uniqueid, ward_uniqueid);
+    polling units whose LGA cannot be found are skipped.
+    """
+    lga_by_id = resolve_lgas(lgas, state_id)
+
+    ward_lga_uniqueids = {}
+    ward_by_key = {}
+    for uniqueid, lga_id, ward_id in wards:
+        if lga_id not in lga_by_id:
+            continue
+        lga_uniqueid = lga_by_id[lga_id][0]
+        ward_lga_uniqueids[uniqueid] = lga_uniqueid
+        ward_by_key.setdefault((lga_uniqueid, ward_id), uniqueid)
+
+    for uniqueid, lga_id, ward_id, uniquewardid in units:
+        if lga_id not in lga_by_id:
+            continue
+        lga_uniqueid, lga_state_id = lga_by_id[lga_id]
+        # Same ward the views have always shown; uniquewardid only as a fallback
+        ward_uniqueid = ward_by_key.get((lga_uniqueid, ward_id))
+        if ward_uniqueid is None and ward_lga_uniqueids.get(uniquewardid) == lga_uniqueid:
+            ward_uniqueid = uniquewardid
+        yield uniqueid, lga_state_id, lga_uniqueid, ward_uniqueid
+
+
+# =============================================================================
+# Incremental maintenance
+# =============================================================================
+
+def update_path(polling_unit):
+    """Write (or remove) the path for one polling unit."""
+    lgas = Lga.objects.filter(lga_id=polling_unit.lga_id)
+    wards = Ward.objects.filter(lga_id=polling_unit.lga_id, ward_id=polling_unit.ward_id)
+    if polling_unit.uniquewardid:
+        wards = wards | Ward.objects.filter(uniqueid=polling_unit.uniquewardid)
+    paths = list(compute_paths(
+        lgas.values_list('uniqueid', 'lga_id', 'state_id'),
+        wards.order_by('uniqueid').values_list('uniqueid', 'lga_id', 'ward_id'),
+        [(polling_unit.uniqueid, polling_unit.lga_id, polling_unit.ward_id, polling_unit.uniquewardid)],
+        state_id=get_current_state_id(),
+    ))
+    if not paths:
+        PollingUnitPath.objects.filter(polling_unit_uniqueid=polling_unit.uniqueid).delete()
+        return None
+    uniqueid, state_id, lga_uniqueid, ward_uniqueid = paths[0]
+    path, _ = PollingUnitPath.objects.update_or_create(
+        polling_unit_uniqueid=uniqueid,
+        defaults={
+            'result_key': str(uniqueid),
+            'state_id': state_id,
+            'lga_uniqueid': lga_uniqueid,
+            'ward_uniqueid': ward_uniqueid,
+        },
+    )
+    return path
+
+
+def update_ward_path(ward):
+    """Write (or remove) the path for one ward."""
+    paths = list(compute_ward_paths(
+        Lga.objects.filter(lga_id=ward.lga_id).values_list('uniqueid', 'lga_id', 'state_id'),
+        [(ward.uniqueid, ward.lga_id)],
+        state_id=get_current_state_id(),
+    ))
+    if not paths:
+        WardPath.objects.filter(ward_uniqueid=ward.uniqueid).delete()
+        return None
+    uniqueid, state_id, lga_uniqueid = paths[0]
+    path, _ = WardPath.objects.update_or_create(
+        ward_uniqueid=uniqueid,
+        defaults={'state_id': state_id, 'lga_uniqueid': lga_uniqueid},
+    )
+    return path
+
+
+# =============================================================================
+# Full rebuild
+# =============================================================================
+
+def get_ambiguous_lga_ids(lgas):
+    """lga_ids that exist in more than one state."""
+    states = {}
+    for _, lga_id, lga_state_id in lgas:
+        states.setdefault(lga_id, set()).add(lga_state_id)
+    return {lga_id for lga_id, state_ids in states.items() if len(state_ids) > 1}
+
+
+def replace_paths(model, key, paths, state_id):
+    """
+    Swap in freshly computed paths: all of them, or with state_id only that
+    state's (plus any stale rows for the same keys).
+    """
+    objects = model.objects.all()
+    if state_id is not None:
+        objects = objects.filter(state_id=state_id)
+    objects.delete()
+    if state_id is not None:
+        keys = [getattr(path, key) for path in paths]
+        for start in range(0, len(keys), 500):
+            model.objects.filter(**{f'{key}__in': keys[start:start + 500]}).delete()
+    model.objects.bulk_create(paths, batch_size=1000)
+
+
+def rebuild_paths(state_id=None):
+    """
+    Recompute the polling unit and ward paths. Returns the number of polling
+    unit paths written.
+
+    With state_id, only that state's paths are rewritten. Polling units and
+    wards whose lga_id also exists in another state keep a path that
+    already points to that other state. Without it every path is rewritten,
+    ambiguous ones going to the current state.
+    """
+    preferred_state_id = get_current_state_id() if state_id is None else state_id
+    lgas = list(Lga.objects.values_list('uniqueid', 'lga_id', 'state_id'))
+    wards = list(Ward.objects.order_by('uniqueid').values_list('uniqueid', 'lga_id', 'ward_id'))
+    units = PollingUnit.objects.values_list('uniqueid', 'lga_id', 'ward_id', 'uniquewardid')
+    claimed_units = set()
+    claimed_wards = set()
+    if state_id is not None:
+        # Limit to the state's LGAs, and leave ambiguous rows that another state already claims
+        state_lga_ids = {lga_id for _, lga_id, lga_state_id in lgas if lga_state_id == state_id}
+        ambiguous = get_ambiguous_lga_ids(lgas) & state_lga_ids
+        units = units.filter(lga_id__in=state_lga_ids)
+        claimed_units = set(
+            PollingUnitPath.objects.exclude(state_id=state_id)
+            .filter(polling_unit_uniqueid__in=units.filter(lga_id__in=ambiguous).values('uniqueid'))
+            .values_list('polling_unit_uniqueid', flat=True)
+        )
+        claimed_wards = set(
+            WardPath.objects.exclude(state_id=state_id)
+            .filter(ward_uniqueid__in=Ward.objects.filter(lga_id__in=ambiguous).values('uniqueid'))
+            .values_list('ward_uniqueid', flat=True)
+        )
+
+    paths = [
+        PollingUnitPath(
+            polling_unit_uniqueid=uniqueid, result_key=str(uniqueid), state_id=path_state_id,
+            lga_uniqueid=lga_uniqueid, ward_uniqueid=ward_uniqueid,
+        )
+        for uniqueid, path_state_id, lga_uniqueid, ward_uniqueid in compute_paths(
+            lgas, wards, units.iterator(), state_id=preferred_state_id,
+        )
+        if uniqueid not in claimed_units
+    ]
+    ward_paths = [
+        WardPath(ward_uniqueid=uniqueid, state_id=path_state_id, lga_uniqueid=lga_uniqueid)
+        for uniqueid, path_state_id, lga_uniqueid in compute_ward_paths(
+            lgas, [(uniqueid, lga_id) for uniqueid, lga_id, _ in wards], state_id=preferred_state_id,
+        )
+        if uniqueid not in claimed_wards and (state_id is None or path_state_id == state_id)
+    ]
+    with transaction.atomic(using=router.db_for_write(PollingUnitPath)):
+        replace_paths(PollingUnitPath, 'polling_unit_uniqueid', paths, state_id)
+        replace_paths(WardPath, 'ward_uniqueid', ward_paths, state_id)
+    return len(paths)
@@ -0,0 +1,115 @@
+"""
+Audit the party-score checksum tree (see results/checksums.py).
+
+Save a snapshot of a state's tree once its results are in and keep it
+somewhere safe; later, compare the live tree against it. Only branches whose
+digests differ are walked, so an unchanged state costs a single comparison.
+
+Writes made around the app (raw SQL, queryset.update()) leave the tree as it
+was, so --against also lists the polling units result_write_log counts as
+written outside the app (SQLite only, see checksums.py) and checks each one's
+stored digest against its result rows.
+
+--recompute compares the stored tree against one recomputed from every
+announced_pu_results row instead: slower, but it needs no snapshot.
+
+Usage:
+    python manage.py audit_result_checksums --save delta-2026-10-19.json
+    python manage.py audit_result_checksums --against delta-2026-10-19.json
+    python manage.py audit_result_checksums --state 25 --recompute
+"""
+
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from results.checksums import (
+    MemoryTree, StoredTree, audit_tree, compute_tree, get_digest, get_outside_writes, snapshot,
+    verify_polling_unit,
+)
+from results.partitions import get_current_state_id, using_state
+
+
+class Command(BaseCommand):
+    help = 'Save or audit the checksum tree of a state, walking only the branches that differ.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--state', type=int, default=None,
+                            help='State to audit (default: RESULTS_DEFAULT_STATE_ID).')
+        mode = parser.add_mutually_exclusive_group(required=True)
+        mode.add_argument('--save', metavar='FILE', help="Write the state's current tree to a snapshot file.")
+        mode.add_argument('--against', metavar='FILE', help='Compare the stored tree with a snapshot file.')
+        mode.add_argument('--recompute', action='store_true',
+                          help='Compare the stored tree with one recomputed from announced_pu_results.')
+
+    def handle(self, *args, state, save, against, recompute, **options):
+        state_id = state if state is not None else get_current_state_id()
+        with using_state(state_id):
+            self.stdout.write(f"State {state_id} root: {get_digest('state', state_id) or '(no checksums)'}")
+            if save:
+                self.save_snapshot(state_id, save)
+                return
+            if against:
+                expected, label = self.load_snapshot(state_id, against), 'snapshot'
+            else:
+                expected, label = MemoryTree(compute_tree(state_id)), 'recomputed'
+
+            differences, compared = audit_tree(expected, StoredTree(), state_id)
+            outside = get_outside_writes(state_id) if against else {}
+            if not differences and not outside:
+                self.stdout.write(self.style.SUCCESS(f'Matches the {label} tree ({compared} nodes compared).'))
+                return
+
+            if differences:
+                self.stdout.write(f'{len(differences)} difference(s), {compared} nodes compared:')
+            for (level, area_uniqueid), expected_digest, stored_digest in differences:
+                line = (
+                    f'  {level} {area_uniqueid}: {label} {short(expected_digest)}, '
+                    f'stored {short(stored_digest)}'
+                )
+                if level == 'pu' and against and str(area_uniqueid) not in outside:
+                    line += ' - changed through the app'
+                self.stdout.write(line)
+
+            if outside:
+                self.stdout.write(f'{len(outside)} polling unit(s) written outside the app:')
+            for key, (writes, app_writes) in sorted(outside.items()):
+                line = f'  pu {key}: {writes} write(s), {app_writes} through the app'
+                if key.isdigit() and verify_polling_unit(int(key)):
+                    line += ' - stored checksum matches its rows'
+                else:
+                    line += ' - stored checksum does NOT match its rows'
+                self.stdout.write(line)
+        raise CommandError(f'{len(differences)} checksum difference(s), {len(outside)} outside write(s) found.')
+
+    def save_snapshot(self, state_id, filename):
+        nodes = snapshot(state_id)
+        data = {
+            'state_id': state_id,
+            'saved_at': timezone.now().isoformat(),
+            'root': get_digest('state', state_id),
+            'nodes': [
+                [level, area_uniqueid, *(parent or (None, None)), digest]
+                for (level, area_uniqueid), (parent, _, digest) in sorted(nodes.items())
+            ],
+        }
+        Path(filename).write_text(json.dumps(data), encoding='utf-8')
+        self.stdout.write(self.style.SUCCESS(f'Saved {len(nodes)} checksum nodes to {filename}.'))
+
+    def load_snapshot(self, state_id, filename):
+        try:
+            data = json.loads(Path(filename).read_text(encoding='utf-8'))
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Cannot read snapshot {filename}: {e}')
+        if data.get('state_id') != state_id:
+            raise CommandError(f"Snapshot {filename} is for state {data.get('state_id')}, not {state_id}.")
+        return MemoryTree({
+            (level, area_uniqueid): ((parent_level, parent_uniqueid) if parent_level else None, state_id, digest)
+            for level, area_uniqueid, parent_level, parent_uniqueid, digest in data['nodes']
+        })
+
+
+def short(digest):
+    return digest[:12] if digest else 'missing'
@@ -0,0 +1,128 @@
+"""
+Copy one state's hierarchy and results data into its own database partition.
+
+The target alias comes from RESULTS_STATE_DATABASES (see results/partitions.py).
+Each partition is a separate database, so several states can be loaded in
+parallel by running this command once per state.
+
+Usage:
+    python manage.py load_state_partition 25
+    python manage.py load_state_partition 25 --source default --replace
+"""
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from results import checksums, hierarchy, races, timeline
+from results.models import (
+    AnnouncedLgaResults, AnnouncedPuResults, Lga, PollingUnit, PollingUnitPath, Ward, WardPath,
+)
+from results.partitions import get_state_databases, using_state
+
+
+BATCH_SIZE = 500
+
+
+def chunks(items, size=BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class Command(BaseCommand):
+    help = "Copy a state's hierarchy and results data into its database partition."
+
+    def add_arguments(self, parser):
+        parser.add_argument('state_id', type=int)
+        parser.add_argument('--source', default=DEFAULT_DB_ALIAS,
+                            help='Database to copy from (default: %(default)s).')
+        parser.add_argument('--replace', action='store_true',
+                            help='Delete existing rows in the partition first.')
+
+    def handle(self, *args, state_id, source, replace, **options):
+        target = get_state_databases().get(state_id)
+        if target is None:
+            raise CommandError(f'State {state_id} has no entry in RESULTS_STATE_DATABASES.')
+        if target == source:
+            raise CommandError('Source and target databases are the same.')
+
+        self.create_tables(target)
+
+        # Pick rows through the source's paths: lga_id alone is only unique per state
+        lga_ids = list(Lga.objects.using(source).filter(state_id=state_id).values_list('lga_id', flat=True))
+        lga_names = [str(lga_id) for lga_id in lga_ids]
+        ward_ids = list(
+            WardPath.objects.using(source).filter(state_id=state_id).values_list('ward_uniqueid', flat=True)
+        )
+        pu_ids = list(
+            PollingUnitPath.objects.using(source).filter(state_id=state_id)
+            .values_list('polling_unit_uniqueid', flat=True)
+        )
+
+        with using_state(state_id), transaction.atomic(using=target):
+            if replace:
+                self.clear(target)
+
+            self.copy([Lga.objects.using(source).filter(state_id=state_id)], target)
+            self.copy([Ward.objects.using(source).filter(uniqueid__in=batch) for batch in chunks(ward_ids)], target)
+            self.copy(
+                [PollingUnit.objects.using(source).filter(uniqueid__in=batch) for batch in chunks(pu_ids)], target,
+            )
+            # announced_lga_results.lga_name holds the lga_id
+            self.copy([AnnouncedLgaResults.objects.using(source).filter(lga_name__in=lga_names)], target)
+            self.copy(
+                [
+                    AnnouncedPuResults.objects.using(source).filter(polling_unit_uniqueid__in=batch)
+                    for batch in chunks([str(pu_id) for pu_id in pu_ids])
+                ],
+                target,
+            )
+
+        with using_state(state_id):
+            hierarchy.rebuild_paths()
+            buckets = timeline.rebuild_timeline()
+            races.rebuild_races()
+            checksums.rebuild_checksums()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Loaded state {state_id} into "{target}": {len(lga_ids)} LGAs, '
+            f'{len(pu_ids)} polling units, {buckets} timeline buckets.'
+        ))
+
+    def create_tables(self, target):
+        """Create the (unmanaged) hierarchy tables, then migrate the results app."""
+        connection = connections[target]
+        existing = set(connection.introspection.table_names())
+        with connection.schema_editor() as editor:
+            for model in (Lga, Ward, PollingUnit, AnnouncedLgaResults):
+                if model._meta.db_table not in existing:
+                    editor.create_model(model)
+        call_command('migrate', 'results', database=target, verbosity=0)
+
+    def clear(self, target):
+        """
+        Empty the partition's data tables with plain DELETEs. ORM deletes would
+        fire the upkeep signals; the derived tables are rebuilt afterwards instead.
+        """
+        connection = connections[target]
+        with connection.cursor() as cursor:
+            for model in (AnnouncedPuResults, AnnouncedLgaResults, PollingUnit, Ward, Lga):
+                cursor.execute(f'DELETE FROM {connection.ops.quote_name(model._meta.db_table)}')
+
+    def copy(self, querysets, target):
+        """Copy the rows of querysets (all over the same model) into target."""
+        copied = 0
+        for queryset in querysets:
+            model = queryset.model
+            batch = []
+            for row in queryset.iterator(chunk_size=BATCH_SIZE):
+                batch.append(row)
+                if len(batch) == BATCH_SIZE:
+                    model.objects.using(target).bulk_create(batch)
+                    copied += len(batch)
+                    batch = []
+            if batch:
+                model.objects.using(target).bulk_create(batch)
+                copied += len(batch)
+        if querysets:
+            self.stdout.write(f'  {querysets[0].model._meta.db_table}: {copied} rows')
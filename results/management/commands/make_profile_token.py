@@ -0,0 +1,19 @@
+"""
+Print a signed token that turns on the request profiler for one hour.
+
+Usage:
+    python manage.py make_profile_token
+    curl -H "X-Profile-Token: <token>" http://localhost:8000/lga-results/?lga_id=15
+"""
+
+from django.core.management.base import BaseCommand
+
+from results.profiling import TOKEN_HEADER, TOKEN_MAX_AGE, make_token
+
+
+class Command(BaseCommand):
+    help = 'Print a signed token that enables request profiling.'
+
+    def handle(self, *args, **options):
+        self.stdout.write(make_token())
+        self.stderr.write(f'Send it as the {TOKEN_HEADER} header; valid for {TOKEN_MAX_AGE // 60} minutes.')
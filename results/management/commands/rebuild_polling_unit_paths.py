@@ -0,0 +1,27 @@
+"""
+Rebuild polling_unit_path and ward_path (state/LGA/ward uniqueids per polling
+unit and ward) for one state.
+
+Usage:
+    python manage.py rebuild_polling_unit_paths
+    python manage.py rebuild_polling_unit_paths --state 25
+"""
+
+from django.core.management.base import BaseCommand
+
+from results.hierarchy import rebuild_paths
+from results.partitions import get_current_state_id, using_state
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the polling unit and ward hierarchy paths used by the views.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--state', type=int, default=None,
+                            help="Rebuild this state's paths (default: RESULTS_DEFAULT_STATE_ID).")
+
+    def handle(self, *args, state, **options):
+        state_id = state if state is not None else get_current_state_id()
+        with using_state(state_id):
+            paths = rebuild_paths(state_id)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {paths} polling unit paths.'))
@@ -0,0 +1,26 @@
+"""
+Rebuild area_party_totals and race_summaries (winners and margins per
+polling unit, ward and LGA) from announced_pu_results.
+
+Usage:
+    python manage.py rebuild_race_summaries
+    python manage.py rebuild_race_summaries --state 25
+"""
+
+from django.core.management.base import BaseCommand
+
+from results.partitions import get_current_state_id, using_state
+from results.races import rebuild_races
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the precomputed winners and margins per polling unit, ward and LGA.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--state', type=int, default=None,
+                            help="Rebuild this state's partition (default: RESULTS_DEFAULT_STATE_ID).")
+
+    def handle(self, *args, state, **options):
+        with using_state(state if state is not None else get_current_state_id()):
+            summaries = rebuild_races()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {summaries} race summaries.'))
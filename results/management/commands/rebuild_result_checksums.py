@@ -0,0 +1,26 @@
+"""
+Rebuild the party-score checksum tree (result_checksums) from
+announced_pu_results.
+
+Usage:
+    python manage.py rebuild_result_checksums
+    python manage.py rebuild_result_checksums --state 25
+"""
+
+from django.core.management.base import BaseCommand
+
+from results.checksums import rebuild_checksums
+from results.partitions import get_current_state_id, using_state
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the checksum tree over polling unit, ward, LGA and state party scores.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--state', type=int, default=None,
+                            help="Rebuild this state's partition (default: RESULTS_DEFAULT_STATE_ID).")
+
+    def handle(self, *args, state, **options):
+        with using_state(state if state is not None else get_current_state_id()):
+            nodes = rebuild_checksums()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {nodes} checksum nodes.'))
@@ -0,0 +1,27 @@
+"""
+Rebuild the time-bucketed LGA totals (lga_result_buckets) from announced_pu_results.
+
+Usage:
+    python manage.py rebuild_result_timeline
+    python manage.py rebuild_result_timeline --state 25
+"""
+
+from django.core.management.base import BaseCommand
+
+from results.partitions import get_current_state_id, using_state
+from results.timeline import get_bucket_seconds, rebuild_timeline
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the time-bucketed LGA totals used by the results timeline API.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--state', type=int, default=None,
+                            help="Rebuild this state's partition (default: RESULTS_DEFAULT_STATE_ID).")
+
+    def handle(self, *args, state, **options):
+        with using_state(state if state is not None else get_current_state_id()):
+            buckets = rebuild_timeline()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {buckets} buckets ({get_bucket_seconds()}s per bucket).'
+        ))
@@ -0,0 +1,40 @@
+"""
+Middleware for the results app.
+"""
+
+from . import profiling
+from .partitions import state_id_from_request, using_state
+
+
+class StatePartitionMiddleware:
+    """
+    Work out which state a request is for and route its results queries to
+    that state's database partition (see partitions.py).
+    Sets request.state_id for the views.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.state_id = state_id_from_request(request)
+        with using_state(request.state_id):
+            return self.get_response(request)
+
+
+class RequestProfilerMiddleware:
+    """
+    Profile requests that carry a valid X-Profile-Token header or are picked by
+    RESULTS_PROFILE_SAMPLE_RATE, and store the capture (see profiling.py).
+    Adds an X-Profile-Capture header naming the stored capture.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not profiling.should_profile(request):
+            return self.get_response(request)
+        response, capture = profiling.profile_request(request, self.get_response)
+        response[profiling.CAPTURE_HEADER] = profiling.save_capture(capture)
+        return response
@@ -0,0 +1,170 @@
+# Generated by Django 4.2.30 on 2026-10-19 08:03
+#
+# announced_pu_results already exists in databases loaded from bincom.sql
+# (db.sqlite3 ships with it), so it is only created where it is missing and
+# a plain `python manage.py migrate` works on both.
+
+from django.db import migrations, models
+
+
+def create_announced_pu_results(apps, schema_editor):
+    model = apps.get_model('results', 'AnnouncedPuResults')
+    if model._meta.db_table not in schema_editor.connection.introspection.table_names():
+        schema_editor.create_model(model)
+
+
+def drop_announced_pu_results(apps, schema_editor):
+    schema_editor.delete_model(apps.get_model('results', 'AnnouncedPuResults'))
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AgentName',
+            fields=[
+                ('name_id', models.AutoField(primary_key=True, serialize=False)),
+                ('firstname', models.CharField(max_length=255)),
+                ('lastname', models.CharField(max_length=255)),
+                ('email', models.CharField(blank=True, max_length=255, null=True)),
+                ('phone', models.CharField(max_length=13)),
+                ('pollingunit_uniqueid', models.IntegerField()),
+            ],
+            options={
+                'verbose_name': 'Agent',
+                'verbose_name_plural': 'Agents',
+                'db_table': 'agentname',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='AnnouncedLgaResults',
+            fields=[
+                ('result_id', models.AutoField(primary_key=True, serialize=False)),
+                ('lga_name', models.CharField(max_length=50)),
+                ('party_abbreviation', models.CharField(max_length=4)),
+                ('party_score', models.IntegerField()),
+                ('entered_by_user', models.CharField(blank=True, max_length=50, null=True)),
+                ('date_entered', models.DateTimeField(blank=True, null=True)),
+                ('user_ip_address', models.CharField(blank=True, max_length=50, null=True)),
+            ],
+            options={
+                'verbose_name': 'LGA Result',
+                'verbose_name_plural': 'LGA Results',
+                'db_table': 'announced_lga_results',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='Lga',
+            fields=[
+                ('uniqueid', models.AutoField(primary_key=True, serialize=False)),
+                ('lga_id', models.IntegerField()),
+                ('lga_name', models.CharField(max_length=50)),
+                ('state_id', models.IntegerField()),
+                ('lga_description', models.TextField(blank=True, null=True)),
+                ('entered_by_user', models.CharField(blank=True, max_length=50, null=True)),
+                ('date_entered', models.DateTimeField(blank=True, null=True)),
+                ('user_ip_address', models.CharField(blank=True, max_length=50, null=True)),
+            ],
+            options={
+                'verbose_name': 'LGA',
+                'verbose_name_plural': 'LGAs',
+                'db_table': 'lga',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='Party',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('partyid', models.CharField(max_length=11)),
+                ('partyname', models.CharField(max_length=11)),
+            ],
+            options={
+                'verbose_name_plural': 'Parties',
+                'db_table': 'party',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='PollingUnit',
+            fields=[
+                ('uniqueid', models.AutoField(primary_key=True, serialize=False)),
+                ('polling_unit_id', models.IntegerField()),
+                ('ward_id', models.IntegerField()),
+                ('lga_id', models.IntegerField()),
+                ('uniquewardid', models.IntegerField(blank=True, null=True)),
+                ('polling_unit_number', models.CharField(blank=True, max_length=50, null=True)),
+                ('polling_unit_name', models.CharField(blank=True, max_length=50, null=True)),
+                ('polling_unit_description', models.TextField(blank=True, null=True)),
+                ('lat', models.CharField(blank=True, max_length=255, null=True)),
+                ('long', models.CharField(blank=True, max_length=255, null=True)),
+                ('entered_by_user', models.CharField(blank=True, max_length=50, null=True)),
+                ('date_entered', models.DateTimeField(blank=True, null=True)),
+                ('user_ip_address', models.CharField(blank=True, max_length=50, null=True)),
+            ],
+            options={
+                'verbose_name': 'Polling Unit',
+                'verbose_name_plural': 'Polling Units',
+                'db_table': 'polling_unit',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='State',
+            fields=[
+                ('state_id', models.IntegerField(primary_key=True, serialize=False)),
+                ('state_name', models.CharField(max_length=50)),
+            ],
+            options={
+                'verbose_name_plural': 'States',
+                'db_table': 'states',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='Ward',
+            fields=[
+                ('uniqueid', models.AutoField(primary_key=True, serialize=False)),
+                ('ward_id', models.IntegerField()),
+                ('ward_name', models.CharField(max_length=50)),
+                ('lga_id', models.IntegerField()),
+                ('ward_description', models.TextField(blank=True, null=True)),
+                ('entered_by_user', models.CharField(blank=True, max_length=50, null=True)),
+                ('date_entered', models.DateTimeField(blank=True, null=True)),
+                ('user_ip_address', models.CharField(blank=True, max_length=50, null=True)),
+            ],
+            options={
+                'db_table': 'ward',
+                'managed': False,
+            },
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='AnnouncedPuResults',
+                    fields=[
+                        ('result_id', models.AutoField(primary_key=True, serialize=False)),
+                        ('polling_unit_uniqueid', models.CharField(max_length=50)),
+                        ('party_abbreviation', models.CharField(max_length=4)),
+                        ('party_score', models.IntegerField()),
+                        ('entered_by_user', models.CharField(blank=True, max_length=50, null=True)),
+                        ('date_entered', models.DateTimeField(blank=True, null=True)),
+                        ('user_ip_address', models.CharField(blank=True, max_length=50, null=True)),
+                    ],
+                    options={
+                        'verbose_name': 'Polling Unit Result',
+                        'verbose_name_plural': 'Polling Unit Results',
+                        'db_table': 'announced_pu_results',
+                    },
+                ),
+            ],
+        ),
+        migrations.RunPython(create_announced_pu_results, drop_announced_pu_results),
+    ]
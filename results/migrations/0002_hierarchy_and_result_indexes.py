@@ -0,0 +1,43 @@
+"""
+Indexes for the columns the admin (and the views) filter and join on.
+
+The hierarchy tables are unmanaged, so Django will not create indexes for
+them from Meta.indexes - we add them with plain SQL instead. Tables that are
+not there yet (an empty or test database) are skipped.
+"""
+
+from django.db import migrations
+
+
+INDEXES = [
+    ('lga_state_id_idx', 'lga', 'state_id'),
+    ('lga_lga_id_idx', 'lga', 'lga_id'),
+    ('ward_lga_id_ward_id_idx', 'ward', 'lga_id, ward_id'),
+    ('polling_unit_lga_id_ward_id_idx', 'polling_unit', 'lga_id, ward_id'),
+    ('apr_polling_unit_uniqueid_idx', 'announced_pu_results', 'polling_unit_uniqueid'),
+    ('apr_party_abbreviation_idx', 'announced_pu_results', 'party_abbreviation'),
+    ('alr_party_abbreviation_idx', 'announced_lga_results', 'party_abbreviation'),
+]
+
+
+def create_indexes(apps, schema_editor):
+    table_names = set(schema_editor.connection.introspection.table_names())
+    for name, table, columns in INDEXES:
+        if table in table_names:
+            schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})')
+
+
+def drop_indexes(apps, schema_editor):
+    for name, _, _ in INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('results', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
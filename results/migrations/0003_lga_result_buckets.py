@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-19 08:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('results', '0002_hierarchy_and_result_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LgaResultBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lga_id', models.IntegerField()),
+                ('party_abbreviation', models.CharField(max_length=4)),
+                ('bucket_start', models.DateTimeField()),
+                ('score', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'LGA Result Bucket',
+                'verbose_name_plural': 'LGA Result Buckets',
+                'db_table': 'lga_result_buckets',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='lgaresultbucket',
+            constraint=models.UniqueConstraint(fields=('lga_id', 'bucket_start', 'party_abbreviation'), name='lga_result_bucket_unique'),
+        ),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 4.2.30 on 2026-10-19 08:08
+
+from django.db import migrations, models
+
+
+def compute_paths(lgas, wards, units):
+    """
+    (polling_unit_uniqueid, state_id, lga_uniqueid, ward_uniqueid) for every
+    polling unit whose LGA can be found. A copy of hierarchy.compute_paths()
+    as it stood when this migration was written; an lga_id found in several
+    states goes to the first LGA with it.
+    """
+    lga_by_id = {}
+    for uniqueid, lga_id, state_id in lgas:
+        lga_by_id.setdefault(lga_id, (uniqueid, state_id))
+
+    ward_lga_uniqueids = {}
+    ward_by_key = {}
+    for uniqueid, lga_id, ward_id in wards:
+        if lga_id not in lga_by_id:
+            continue
+        lga_uniqueid = lga_by_id[lga_id][0]
+        ward_lga_uniqueids[uniqueid] = lga_uniqueid
+        ward_by_key.setdefault((lga_uniqueid, ward_id), uniqueid)
+
+    for uniqueid, lga_id, ward_id, uniquewardid in units:
+        if lga_id not in lga_by_id:
+            continue
+        lga_uniqueid, state_id = lga_by_id[lga_id]
+        ward_uniqueid = ward_by_key.get((lga_uniqueid, ward_id))
+        if ward_uniqueid is None and ward_lga_uniqueids.get(uniquewardid) == lga_uniqueid:
+            ward_uniqueid = uniquewardid
+        yield uniqueid, state_id, lga_uniqueid, ward_uniqueid
+
+
+def build_paths(apps, schema_editor):
+    """Fill polling_unit_path for the polling units already in the database."""
+    connection = schema_editor.connection
+    if not {'lga', 'ward', 'polling_unit'} <= set(connection.introspection.table_names()):
+        return
+    Lga = apps.get_model('results', 'Lga')
+    Ward = apps.get_model('results', 'Ward')
+    PollingUnit = apps.get_model('results', 'PollingUnit')
+    PollingUnitPath = apps.get_model('results', 'PollingUnitPath')
+    db = connection.alias
+    PollingUnitPath.objects.using(db).bulk_create(
+        [
+            PollingUnitPath(
+                polling_unit_uniqueid=uniqueid, result_key=str(uniqueid), state_id=state_id,
+                lga_uniqueid=lga_uniqueid, ward_uniqueid=ward_uniqueid,
+            )
+            for uniqueid, state_id, lga_uniqueid, ward_uniqueid in compute_paths(
+                Lga.objects.using(db).order_by('uniqueid').values_list('uniqueid', 'lga_id', 'state_id'),
+                Ward.objects.using(db).order_by('uniqueid').values_list('uniqueid', 'lga_id', 'ward_id'),
+                PollingUnit.objects.using(db).values_list('uniqueid', 'lga_id', 'ward_id', 'uniquewardid'),
+            )
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('results', '0003_lga_result_buckets'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PollingUnitPath',
+            fields=[
+                ('polling_unit_uniqueid', models.IntegerField(primary_key=True, serialize=False)),
+                ('result_key', models.CharField(max_length=50, unique=True)),
+                ('state_id', models.IntegerField()),
+                ('lga_uniqueid', models.IntegerField()),
+                ('ward_uniqueid', models.IntegerField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Polling Unit Path',
+                'verbose_name_plural': 'Polling Unit Paths',
+                'db_table': 'polling_unit_path',
+                'indexes': [models.Index(fields=['state_id', 'lga_uniqueid', 'ward_uniqueid'], name='pu_path_state_lga_ward_idx'), models.Index(fields=['lga_uniqueid', 'ward_uniqueid'], name='pu_path_lga_ward_idx')],
+            },
+        ),
+        migrations.RunPython(build_paths, migrations.RunPython.noop),
+    ]
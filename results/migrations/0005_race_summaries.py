@@ -0,0 +1,128 @@
+# Generated by Django 4.2.30 on 2026-10-19 08:11
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def summarize(scores):
+    """Winner/runner-up/margin/turnout for {party: score}, or None if no votes."""
+    ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+    if not ranked or ranked[0][1] <= 0:
+        return None
+    winner, winner_score = ranked[0]
+    runner_up, runner_up_score = ranked[1] if len(ranked) > 1 else (None, 0)
+    return {
+        'winner': winner,
+        'winner_score': winner_score,
+        'runner_up': runner_up,
+        'runner_up_score': runner_up_score,
+        'margin': winner_score - runner_up_score,
+        'turnout': sum(scores.values()),
+    }
+
+
+def fill_races(apps, schema_editor):
+    """Sum the results already in the database into the new tables."""
+    AreaPartyTotal = apps.get_model('results', 'AreaPartyTotal')
+    AnnouncedPuResults = apps.get_model('results', 'AnnouncedPuResults')
+    PollingUnitPath = apps.get_model('results', 'PollingUnitPath')
+    RaceSummary = apps.get_model('results', 'RaceSummary')
+    db = schema_editor.connection.alias
+
+    paths = {
+        result_key: (polling_unit_uniqueid, ward_uniqueid, lga_uniqueid, state_id)
+        for result_key, polling_unit_uniqueid, ward_uniqueid, lga_uniqueid, state_id
+        in PollingUnitPath.objects.using(db).values_list(
+            'result_key', 'polling_unit_uniqueid', 'ward_uniqueid', 'lga_uniqueid', 'state_id',
+        )
+    }
+    scores = defaultdict(lambda: defaultdict(int))  # (level, area_uniqueid) -> {party: score}
+    locations = {}  # (level, area_uniqueid) -> (state_id, lga_uniqueid)
+    rows = (
+        AnnouncedPuResults.objects.using(db)
+        .values_list('polling_unit_uniqueid', 'party_abbreviation', 'party_score')
+        .iterator(chunk_size=5000)
+    )
+    for polling_unit_uniqueid, party, score in rows:
+        if polling_unit_uniqueid not in paths:
+            continue
+        pu_uniqueid, ward_uniqueid, lga_uniqueid, state_id = paths[polling_unit_uniqueid]
+        for area in (('pu', pu_uniqueid), ('ward', ward_uniqueid), ('lga', lga_uniqueid)):
+            if area[1] is not None:
+                scores[area][party] += score
+                locations.setdefault(area, (state_id, lga_uniqueid))
+
+    AreaPartyTotal.objects.using(db).bulk_create(
+        [
+            AreaPartyTotal(level=level, area_uniqueid=area_uniqueid, party_abbreviation=party, score=score)
+            for (level, area_uniqueid), area_scores in scores.items()
+            for party, score in area_scores.items()
+        ],
+        batch_size=1000,
+    )
+    summaries = []
+    for (level, area_uniqueid), area_scores in scores.items():
+        summary = summarize(area_scores)
+        if summary is not None:
+            state_id, lga_uniqueid = locations[(level, area_uniqueid)]
+            summaries.append(RaceSummary(
+                level=level, area_uniqueid=area_uniqueid, state_id=state_id, lga_uniqueid=lga_uniqueid, **summary,
+            ))
+    RaceSummary.objects.using(db).bulk_create(summaries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('results', '0004_polling_unit_path'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AreaPartyTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.CharField(choices=[('pu', 'Polling Unit'), ('ward', 'Ward'), ('lga', 'LGA')], max_length=4)),
+                ('area_uniqueid', models.IntegerField()),
+                ('party_abbreviation', models.CharField(max_length=4)),
+                ('score', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Area Party Total',
+                'verbose_name_plural': 'Area Party Totals',
+                'db_table': 'area_party_totals',
+            },
+        ),
+        migrations.CreateModel(
+            name='RaceSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.CharField(choices=[('pu', 'Polling Unit'), ('ward', 'Ward'), ('lga', 'LGA')], max_length=4)),
+                ('area_uniqueid', models.IntegerField()),
+                ('state_id', models.IntegerField()),
+                ('lga_uniqueid', models.IntegerField()),
+                ('winner', models.CharField(max_length=4)),
+                ('winner_score', models.BigIntegerField()),
+                ('runner_up', models.CharField(blank=True, max_length=4, null=True)),
+                ('runner_up_score', models.BigIntegerField(default=0)),
+                ('margin', models.BigIntegerField()),
+                ('turnout', models.BigIntegerField()),
+            ],
+            options={
+                'verbose_name': 'Race Summary',
+                'verbose_name_plural': 'Race Summaries',
+                'db_table': 'race_summaries',
+                'indexes': [models.Index(fields=['state_id', 'level', 'margin', 'area_uniqueid'], name='race_state_margin_idx'), models.Index(fields=['state_id', 'level', 'winner', 'margin', 'area_uniqueid'], name='race_state_winner_margin_idx'), models.Index(fields=['lga_uniqueid', 'level', 'margin', 'area_uniqueid'], name='race_lga_margin_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='racesummary',
+            constraint=models.UniqueConstraint(fields=('level', 'area_uniqueid'), name='race_summary_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='areapartytotal',
+            constraint=models.UniqueConstraint(fields=('level', 'area_uniqueid', 'party_abbreviation'), name='area_party_total_unique'),
+        ),
+        migrations.RunPython(fill_races, migrations.RunPython.noop),
+    ]
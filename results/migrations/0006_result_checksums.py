@@ -0,0 +1,107 @@
+# Generated by Django 4.2.30 on 2026-10-19 08:18
+
+import hashlib
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def sha256(lines):
+    return hashlib.sha256('\n'.join(lines).encode('utf-8')).hexdigest()
+
+
+def fill_checksums(apps, schema_editor):
+    """
+    Hash the results already in the database into the new tree, with the
+    digests checksums.py used when this migration was written.
+    """
+    AnnouncedPuResults = apps.get_model('results', 'AnnouncedPuResults')
+    PollingUnitPath = apps.get_model('results', 'PollingUnitPath')
+    ResultChecksum = apps.get_model('results', 'ResultChecksum')
+    db = schema_editor.connection.alias
+
+    paths = {path.result_key: path for path in PollingUnitPath.objects.using(db)}
+    scores = defaultdict(list)
+    for polling_unit_uniqueid, party, score in (
+        AnnouncedPuResults.objects.using(db)
+        .values_list('polling_unit_uniqueid', 'party_abbreviation', 'party_score')
+        .iterator(chunk_size=5000)
+    ):
+        if polling_unit_uniqueid in paths:
+            scores[polling_unit_uniqueid].append((party, score))
+
+    nodes = {}  # (level, area_uniqueid) -> [parent, state_id, digest]
+    children = defaultdict(list)  # parent -> [(level, area_uniqueid, digest)]
+    for result_key, pu_scores in scores.items():
+        path = paths[result_key]
+        state = ('state', path.state_id)
+        lga = ('lga', path.lga_uniqueid)
+        pu = ('pu', path.polling_unit_uniqueid)
+        if path.ward_uniqueid is None:
+            ancestors = [(pu, lga), (lga, state), (state, None)]
+        else:
+            ward = ('ward', path.ward_uniqueid)
+            ancestors = [(pu, ward), (ward, lga), (lga, state), (state, None)]
+        digest = sha256([
+            f'pu:{path.polling_unit_uniqueid}', *sorted(f'{party}:{score}' for party, score in pu_scores),
+        ])
+        nodes[pu] = [ancestors[0][1], path.state_id, digest]
+        children[ancestors[0][1]].append((*pu, digest))
+        for node, parent in ancestors[1:]:
+            nodes.setdefault(node, [parent, path.state_id, None])
+
+    # Bottom-up: wards, then LGAs, then states
+    for level in ('ward', 'lga', 'state'):
+        for node, values in nodes.items():
+            if node[0] == level:
+                values[2] = sha256([
+                    f'{level}:{node[1]}',
+                    *(f'{child_level}:{child_uniqueid}:{digest}'
+                      for child_level, child_uniqueid, digest in sorted(children[node])),
+                ])
+                if values[0] is not None:
+                    children[values[0]].append((*node, values[2]))
+
+    ResultChecksum.objects.using(db).bulk_create(
+        [
+            ResultChecksum(
+                level=level, area_uniqueid=area_uniqueid, state_id=state_id, digest=digest,
+                parent_level=parent[0] if parent else None, parent_uniqueid=parent[1] if parent else None,
+            )
+            for (level, area_uniqueid), (parent, state_id, digest) in nodes.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('results', '0005_race_summaries'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResultChecksum',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.CharField(choices=[('pu', 'Polling Unit'), ('ward', 'Ward'), ('lga', 'LGA'), ('state', 'State')], max_length=5)),
+                ('area_uniqueid', models.IntegerField()),
+                ('state_id', models.IntegerField()),
+                ('parent_level', models.CharField(blank=True, choices=[('pu', 'Polling Unit'), ('ward', 'Ward'), ('lga', 'LGA'), ('state', 'State')], max_length=5, null=True)),
+                ('parent_uniqueid', models.IntegerField(blank=True, null=True)),
+                ('digest', models.CharField(max_length=64)),
+            ],
+            options={
+                'verbose_name': 'Result Checksum',
+                'verbose_name_plural': 'Result Checksums',
+                'db_table': 'result_checksums',
+                'indexes': [models.Index(fields=['parent_level', 'parent_uniqueid', 'level', 'area_uniqueid'], name='result_checksum_parent_idx'), models.Index(fields=['state_id', 'level'], name='result_checksum_state_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='resultchecksum',
+            constraint=models.UniqueConstraint(fields=('level', 'area_uniqueid'), name='result_checksum_unique'),
+        ),
+        migrations.RunPython(fill_checksums, migrations.RunPython.noop),
+    ]
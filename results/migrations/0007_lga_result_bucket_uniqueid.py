@@ -0,0 +1,70 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:12
+
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def bucket_start(moment):
+    """Round a datetime down to the start of its timeline bucket (in UTC)."""
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    seconds = getattr(settings, 'RESULTS_TIMELINE_BUCKET_SECONDS', 300)
+    epoch = int(moment.timestamp())
+    start = datetime.fromtimestamp(epoch - epoch % seconds, tz=dt_timezone.utc)
+    return start if settings.USE_TZ else timezone.make_naive(start)
+
+
+def fill_buckets(apps, schema_editor):
+    """Re-sum the buckets under LGA uniqueids (lga_id is only unique per state)."""
+    AnnouncedPuResults = apps.get_model('results', 'AnnouncedPuResults')
+    LgaResultBucket = apps.get_model('results', 'LgaResultBucket')
+    PollingUnitPath = apps.get_model('results', 'PollingUnitPath')
+    db = schema_editor.connection.alias
+    lga_uniqueids = dict(PollingUnitPath.objects.using(db).values_list('result_key', 'lga_uniqueid'))
+    totals = defaultdict(int)
+    rows = (
+        AnnouncedPuResults.objects.using(db)
+        .filter(date_entered__isnull=False)
+        .values_list('polling_unit_uniqueid', 'party_abbreviation', 'date_entered', 'party_score')
+        .iterator(chunk_size=5000)
+    )
+    for polling_unit_uniqueid, party, date_entered, score in rows:
+        lga_uniqueid = lga_uniqueids.get(polling_unit_uniqueid)
+        if lga_uniqueid is not None:
+            totals[(lga_uniqueid, party, bucket_start(date_entered))] += score
+    LgaResultBucket.objects.using(db).all().delete()
+    LgaResultBucket.objects.using(db).bulk_create(
+        [
+            LgaResultBucket(lga_uniqueid=lga_uniqueid, party_abbreviation=party, bucket_start=start, score=score)
+            for (lga_uniqueid, party, start), score in totals.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('results', '0006_result_checksums'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='lgaresultbucket',
+            name='lga_result_bucket_unique',
+        ),
+        migrations.RenameField(
+            model_name='lgaresultbucket',
+            old_name='lga_id',
+            new_name='lga_uniqueid',
+        ),
+        migrations.AddConstraint(
+            model_name='lgaresultbucket',
+            constraint=models.UniqueConstraint(fields=('lga_uniqueid', 'bucket_start', 'party_abbreviation'), name='lga_result_bucket_unique'),
+        ),
+        migrations.RunPython(fill_buckets, migrations.RunPython.noop),
+    ]
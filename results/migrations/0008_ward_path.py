@@ -0,0 +1,55 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:34
+
+from django.db import migrations, models
+
+
+def build_ward_paths(apps, schema_editor):
+    """
+    Fill ward_path for the wards already in the database. Where an lga_id is
+    found in several states, the ward goes to the first LGA with it.
+    """
+    connection = schema_editor.connection
+    if not {'lga', 'ward'} <= set(connection.introspection.table_names()):
+        return
+    Lga = apps.get_model('results', 'Lga')
+    Ward = apps.get_model('results', 'Ward')
+    WardPath = apps.get_model('results', 'WardPath')
+    db = connection.alias
+    lga_by_id = {}
+    for uniqueid, lga_id, state_id in Lga.objects.using(db).order_by('uniqueid').values_list(
+        'uniqueid', 'lga_id', 'state_id',
+    ):
+        lga_by_id.setdefault(lga_id, (uniqueid, state_id))
+    WardPath.objects.using(db).bulk_create(
+        [
+            WardPath(ward_uniqueid=uniqueid, state_id=lga_by_id[lga_id][1], lga_uniqueid=lga_by_id[lga_id][0])
+            for uniqueid, lga_id in Ward.objects.using(db).values_list('uniqueid', 'lga_id')
+            if lga_id in lga_by_id
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('results', '0007_lga_result_bucket_uniqueid'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WardPath',
+            fields=[
+                ('ward_uniqueid', models.IntegerField(primary_key=True, serialize=False)),
+                ('state_id', models.IntegerField()),
+                ('lga_uniqueid', models.IntegerField()),
+            ],
+            options={
+                'verbose_name': 'Ward Path',
+                'verbose_name_plural': 'Ward Paths',
+                'db_table': 'ward_path',
+                'indexes': [models.Index(fields=['lga_uniqueid', 'ward_uniqueid'], name='ward_path_lga_idx'), models.Index(fields=['state_id'], name='ward_path_state_idx')],
+            },
+        ),
+        migrations.RunPython(build_ward_paths, migrations.RunPython.noop),
+    ]
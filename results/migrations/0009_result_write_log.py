@@ -0,0 +1,68 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:40
+
+from django.db import migrations, models
+
+
+# Count every write to announced_pu_results, including raw SQL that bypasses
+# the app's signals, in result_write_log.writes
+BUMP = '''
+    INSERT OR IGNORE INTO result_write_log (polling_unit_key, writes, app_writes) VALUES ({key}, 0, 0);
+    UPDATE result_write_log SET writes = writes + 1 WHERE polling_unit_key = {key};
+'''
+
+TRIGGERS = {
+    'result_write_log_insert': f'''
+        CREATE TRIGGER result_write_log_insert AFTER INSERT ON announced_pu_results
+        BEGIN {BUMP.format(key='NEW.polling_unit_uniqueid')} END
+    ''',
+    'result_write_log_update': f'''
+        CREATE TRIGGER result_write_log_update AFTER UPDATE ON announced_pu_results
+        BEGIN {BUMP.format(key='OLD.polling_unit_uniqueid')} END
+    ''',
+    'result_write_log_update_key': f'''
+        CREATE TRIGGER result_write_log_update_key AFTER UPDATE OF polling_unit_uniqueid ON announced_pu_results
+        WHEN NEW.polling_unit_uniqueid IS NOT OLD.polling_unit_uniqueid
+        BEGIN {BUMP.format(key='NEW.polling_unit_uniqueid')} END
+    ''',
+    'result_write_log_delete': f'''
+        CREATE TRIGGER result_write_log_delete AFTER DELETE ON announced_pu_results
+        BEGIN {BUMP.format(key='OLD.polling_unit_uniqueid')} END
+    ''',
+}
+
+
+def create_triggers(apps, schema_editor):
+    # SQLite only for now: other backends keep an empty log
+    if schema_editor.connection.vendor == 'sqlite':
+        for sql in TRIGGERS.values():
+            schema_editor.execute(sql)
+
+
+def drop_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for name in TRIGGERS:
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('results', '0008_ward_path'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResultWriteLog',
+            fields=[
+                ('polling_unit_key', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('writes', models.IntegerField(default=0)),
+                ('app_writes', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Result Write Log',
+                'verbose_name_plural': 'Result Write Log',
+                'db_table': 'result_write_log',
+            },
+        ),
+        migrations.RunPython(create_triggers, drop_triggers),
+    ]
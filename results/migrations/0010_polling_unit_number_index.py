@@ -0,0 +1,28 @@
+"""
+Index polling_unit.polling_unit_number for the admin's exact-match search.
+Like 0002, it is skipped where the unmanaged table does not exist.
+"""
+
+from django.db import migrations
+
+
+def create_index(apps, schema_editor):
+    if 'polling_unit' in schema_editor.connection.introspection.table_names():
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS polling_unit_number_idx ON polling_unit (polling_unit_number)'
+        )
+
+
+def drop_index(apps, schema_editor):
+    schema_editor.execute('DROP INDEX IF EXISTS polling_unit_number_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('results', '0009_result_write_log'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
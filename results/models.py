@@ -158,3 +158,185 @@ class AgentName(models.Model):
 
     def __str__(self):
         return f"{self.firstname} {self.lastname}"
+
+
+class LgaResultBucket(models.Model):
+    """
+    Party totals per LGA per time bucket, keyed on AnnouncedPuResults.date_entered.
+    Maintained incrementally by results/timeline.py - used for "results as of T".
+    """
+    lga_uniqueid = models.IntegerField()
+    party_abbreviation = models.CharField(max_length=4)
+    bucket_start = models.DateTimeField()
+    score = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'lga_result_buckets'
+        verbose_name = 'LGA Result Bucket'
+        verbose_name_plural = 'LGA Result Buckets'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['lga_uniqueid', 'bucket_start', 'party_abbreviation'],
+                name='lga_result_bucket_unique',
+            ),
+        ]
+
+    def __str__(self):
+        return f"LGA {self.lga_uniqueid} @ {self.bucket_start} - {self.party_abbreviation}: {self.score}"
+
+
+class PollingUnitPath(models.Model):
+    """
+    Denormalized hierarchy path: one row per polling unit with the uniqueids of
+    its state, LGA and ward. Maintained by results/hierarchy.py, so any listing
+    or aggregate is a single indexed join instead of lga_id/ward_id matching.
+    """
+    polling_unit_uniqueid = models.IntegerField(primary_key=True)
+    # The PU uniqueid as text, matching announced_pu_results.polling_unit_uniqueid
+    result_key = models.CharField(max_length=50, unique=True)
+    state_id = models.IntegerField()
+    lga_uniqueid = models.IntegerField()
+    ward_uniqueid = models.IntegerField(blank=True, null=True)
+
+    class Meta:
+        db_table = 'polling_unit_path'
+        verbose_name = 'Polling Unit Path'
+        verbose_name_plural = 'Polling Unit Paths'
+        indexes = [
+            models.Index(fields=['state_id', 'lga_uniqueid', 'ward_uniqueid'], name='pu_path_state_lga_ward_idx'),
+            models.Index(fields=['lga_uniqueid', 'ward_uniqueid'], name='pu_path_lga_ward_idx'),
+        ]
+
+    def __str__(self):
+        return f"PU {self.polling_unit_uniqueid}: state {self.state_id} / LGA {self.lga_uniqueid} / ward {self.ward_uniqueid}"
+
+
+class WardPath(models.Model):
+    """
+    The state and LGA uniqueids of a ward, resolved from its lga_id the same
+    way as PollingUnitPath. Maintained by results/hierarchy.py.
+    """
+    ward_uniqueid = models.IntegerField(primary_key=True)
+    state_id = models.IntegerField()
+    lga_uniqueid = models.IntegerField()
+
+    class Meta:
+        db_table = 'ward_path'
+        verbose_name = 'Ward Path'
+        verbose_name_plural = 'Ward Paths'
+        indexes = [
+            models.Index(fields=['lga_uniqueid', 'ward_uniqueid'], name='ward_path_lga_idx'),
+            models.Index(fields=['state_id'], name='ward_path_state_idx'),
+        ]
+
+    def __str__(self):
+        return f"Ward {self.ward_uniqueid}: state {self.state_id} / LGA {self.lga_uniqueid}"
+
+
+class AreaPartyTotal(models.Model):
+    """Party totals per polling unit, ward and LGA - kept up to date by results/races.py"""
+    LEVEL_CHOICES = [('pu', 'Polling Unit'), ('ward', 'Ward'), ('lga', 'LGA')]
+
+    level = models.CharField(max_length=4, choices=LEVEL_CHOICES)
+    area_uniqueid = models.IntegerField()
+    party_abbreviation = models.CharField(max_length=4)
+    score = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'area_party_totals'
+        verbose_name = 'Area Party Total'
+        verbose_name_plural = 'Area Party Totals'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['level', 'area_uniqueid', 'party_abbreviation'],
+                name='area_party_total_unique',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.level} {self.area_uniqueid} - {self.party_abbreviation}: {self.score}"
+
+
+class RaceSummary(models.Model):
+    """
+    Winner, runner-up, margin and turnout (total votes) for one polling unit,
+    ward or LGA. Indexed for "closest races" / "biggest wins" top-k queries.
+    """
+    level = models.CharField(max_length=4, choices=AreaPartyTotal.LEVEL_CHOICES)
+    area_uniqueid = models.IntegerField()
+    state_id = models.IntegerField()
+    lga_uniqueid = models.IntegerField()
+    winner = models.CharField(max_length=4)
+    winner_score = models.BigIntegerField()
+    runner_up = models.CharField(max_length=4, blank=True, null=True)
+    runner_up_score = models.BigIntegerField(default=0)
+    margin = models.BigIntegerField()
+    turnout = models.BigIntegerField()
+
+    class Meta:
+        db_table = 'race_summaries'
+        verbose_name = 'Race Summary'
+        verbose_name_plural = 'Race Summaries'
+        constraints = [
+            models.UniqueConstraint(fields=['level', 'area_uniqueid'], name='race_summary_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['state_id', 'level', 'margin', 'area_uniqueid'], name='race_state_margin_idx'),
+            models.Index(fields=['state_id', 'level', 'winner', 'margin', 'area_uniqueid'],
+                         name='race_state_winner_margin_idx'),
+            models.Index(fields=['lga_uniqueid', 'level', 'margin', 'area_uniqueid'], name='race_lga_margin_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.level} {self.area_uniqueid}: {self.winner} by {self.margin}"
+
+
+class ResultChecksum(models.Model):
+    """
+    One node of the party-score checksum tree (polling unit -> ward -> LGA ->
+    state). Maintained by results/checksums.py; the state node is the root.
+    """
+    LEVEL_CHOICES = [('pu', 'Polling Unit'), ('ward', 'Ward'), ('lga', 'LGA'), ('state', 'State')]
+
+    level = models.CharField(max_length=5, choices=LEVEL_CHOICES)
+    area_uniqueid = models.IntegerField()
+    state_id = models.IntegerField()
+    parent_level = models.CharField(max_length=5, choices=LEVEL_CHOICES, blank=True, null=True)
+    parent_uniqueid = models.IntegerField(blank=True, null=True)
+    digest = models.CharField(max_length=64)
+
+    class Meta:
+        db_table = 'result_checksums'
+        verbose_name = 'Result Checksum'
+        verbose_name_plural = 'Result Checksums'
+        constraints = [
+            models.UniqueConstraint(fields=['level', 'area_uniqueid'], name='result_checksum_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['parent_level', 'parent_uniqueid', 'level', 'area_uniqueid'],
+                         name='result_checksum_parent_idx'),
+            models.Index(fields=['state_id', 'level'], name='result_checksum_state_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.level} {self.area_uniqueid}: {self.digest[:12]}"
+
+
+class ResultWriteLog(models.Model):
+    """
+    Writes to announced_pu_results per polling unit since the last checksum
+    rebuild: `writes` is counted by database triggers, `app_writes` by the
+    app. A polling unit whose counts differ was written around the app.
+    Balanced rows are deleted - see results/checksums.py.
+    """
+    polling_unit_key = models.CharField(max_length=50, primary_key=True)
+    writes = models.IntegerField(default=0)
+    app_writes = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'result_write_log'
+        verbose_name = 'Result Write Log'
+        verbose_name_plural = 'Result Write Log'
+
+    def __str__(self):
+        return f"PU {self.polling_unit_key}: {self.writes} writes, {self.app_writes} through the app"
@@ -0,0 +1,156 @@
+"""
+State Partitions
+================
+Every view works on one state at a time (the "current state"), taken from the
+request by StatePartitionMiddleware. Results data for a state can live in its
+own database alias - usually a separate SQLite file - configured in settings:
+
+    DATABASES['delta'] = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': BASE_DIR / 'delta.sqlite3'}
+    RESULTS_STATE_DATABASES = {25: 'delta'}
+
+StatePartitionRouter then sends every query for the results app to the
+current state's alias, so one state's aggregates never scan another state's
+rows. States without an entry use the 'default' database. Reference tables
+shared by all states (states, party) always stay in 'default'.
+
+Load a partition with `python manage.py load_state_partition <state_id>`;
+partitions are independent files, so several can be loaded in parallel.
+Totals across states are computed by fan_out(): one query per partition,
+merged in Python.
+"""
+
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+DEFAULT_STATE_ID = 25  # Delta
+
+_current_state_id = ContextVar('results_current_state_id', default=None)
+
+
+def get_default_state_id():
+    return getattr(settings, 'RESULTS_DEFAULT_STATE_ID', DEFAULT_STATE_ID)
+
+
+def get_state_databases():
+    """{state_id: database alias} for the states that have their own partition."""
+    return getattr(settings, 'RESULTS_STATE_DATABASES', {})
+
+
+def get_current_state_id():
+    """The state the current request (or using_state block) is working on."""
+    state_id = _current_state_id.get()
+    return get_default_state_id() if state_id is None else state_id
+
+
+def database_for_state(state_id):
+    """Database alias holding a state's results data."""
+    return get_state_databases().get(state_id, DEFAULT_DB_ALIAS)
+
+
+@contextmanager
+def using_state(state_id):
+    """Route results queries inside the block to `state_id`'s partition."""
+    token = _current_state_id.set(state_id)
+    try:
+        yield
+    finally:
+        _current_state_id.reset(token)
+
+
+def state_id_from_request(request):
+    """
+    Read the state from ?state_id=, a posted state_id field or the X-State-Id
+    header. Falls back to RESULTS_DEFAULT_STATE_ID if missing or invalid.
+    """
+    value = (
+        request.GET.get('state_id')
+        or (request.POST.get('state_id') if request.method == 'POST' else None)
+        or request.headers.get('X-State-Id')
+    )
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return get_default_state_id()
+
+
+class StatePartitionRouter:
+    """Database router that sends results app queries to the current state's partition."""
+
+    app_label = 'results'
+    shared_models = {'state', 'party'}
+
+    def _partition(self, model):
+        if model._meta.app_label != self.app_label:
+            return None
+        if model._meta.model_name in self.shared_models:
+            return DEFAULT_DB_ALIAS
+        return database_for_state(get_current_state_id())
+
+    def db_for_read(self, model, **hints):
+        return self._partition(model)
+
+    def db_for_write(self, model, **hints):
+        return self._partition(model)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if obj1._meta.app_label == obj2._meta.app_label == self.app_label:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Partitions only hold results data - auth, sessions etc. stay in 'default'
+        if db in get_state_databases().values():
+            return app_label == self.app_label
+        return None
+
+
+# =============================================================================
+# Cross-state queries
+# =============================================================================
+
+def fan_out(func, state_ids):
+    """
+    Call func(state_id) for every state, each routed to its own partition and
+    run in parallel. Returns {state_id: result}.
+    """
+    def run(state_id):
+        try:
+            with using_state(state_id):
+                return state_id, func(state_id)
+        finally:
+            # Worker threads get their own connections - don't leak them
+            connections.close_all()
+
+    state_ids = list(state_ids)
+    if not state_ids:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(len(state_ids), 8)) as executor:
+        return dict(executor.map(run, state_ids))
+
+
+def state_party_totals(state_id):
+    """Party totals for every polling unit in one state, from its partition."""
+    with connections[database_for_state(state_id)].cursor() as cursor:
+        cursor.execute('''
+            SELECT apr.party_abbreviation, SUM(apr.party_score)
+            FROM polling_unit_path p
+            JOIN announced_pu_results apr ON apr.polling_unit_uniqueid = p.result_key
+            WHERE p.state_id = %s
+            GROUP BY apr.party_abbreviation
+        ''', [state_id])
+        return dict(cursor.fetchall())
+
+
+def party_totals_across_states(state_ids):
+    """Fan out state_party_totals() and merge. Returns (merged, per_state)."""
+    per_state = fan_out(state_party_totals, state_ids)
+    merged = Counter()
+    for totals in per_state.values():
+        merged.update(totals)
+    return dict(merged), per_state
@@ -0,0 +1,210 @@
+"""
+Request Profiler
+================
+Opt-in profiling for slow pages. A request is profiled when either
+- it carries a valid X-Profile-Token header (make one with
+  `python manage.py make_profile_token`), or
+- it is picked by random sampling (RESULTS_PROFILE_SAMPLE_RATE, 0 = off).
+
+A capture holds a cProfile summary of the request, every SQL statement with
+its timing, and EXPLAIN QUERY PLAN output for SELECTs slower than
+RESULTS_PROFILE_SLOW_QUERY_MS. Parameter values are only kept for those slow
+SELECTs, and never for queries on django_session or the auth_* tables, so
+captures do not hold session keys or password hashes. Captures are JSON files in RESULTS_PROFILE_DIR;
+only the newest RESULTS_PROFILE_MAX_CAPTURES are kept. Staff can browse them
+at /profiles/.
+"""
+
+import cProfile
+import io
+import json
+import pstats
+import random
+import re
+import time
+import uuid
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.core import signing
+from django.db import connections
+from django.utils import timezone
+
+
+TOKEN_HEADER = 'X-Profile-Token'
+CAPTURE_HEADER = 'X-Profile-Capture'
+TOKEN_SALT = 'results.profiling'
+TOKEN_MAX_AGE = 60 * 60  # seconds
+CAPTURE_NAME = re.compile(r'^[\w-]+\.json$')
+# Tables whose parameter values (session keys, password hashes) must not be stored
+SENSITIVE_TABLE = re.compile(r'\b(django_session|auth_\w+)\b', re.IGNORECASE)
+
+
+def get_profile_dir():
+    return Path(getattr(settings, 'RESULTS_PROFILE_DIR', settings.BASE_DIR / 'profiles'))
+
+
+def make_token():
+    """A signed token that enables profiling for TOKEN_MAX_AGE seconds."""
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign('profile')
+
+
+def has_valid_token(request):
+    token = request.headers.get(TOKEN_HEADER)
+    if not token:
+        return False
+    try:
+        signing.TimestampSigner(salt=TOKEN_SALT).unsign(token, max_age=TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def should_profile(request):
+    if has_valid_token(request):
+        return True
+    rate = getattr(settings, 'RESULTS_PROFILE_SAMPLE_RATE', 0)
+    return rate > 0 and random.random() < rate
+
+
+# =============================================================================
+# Capturing
+# =============================================================================
+
+class QueryRecorder:
+    """
+    execute_wrapper that records every SQL statement and its duration.
+    Parameters are held in memory only, until profile_request() decides
+    whether the query needs them for EXPLAIN.
+    """
+
+    def __init__(self, alias):
+        self.alias = alias
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'alias': self.alias,
+                'sql': sql,
+                'params': None,
+                '_raw_params': None if many else params,
+                'many': many,
+                'ms': round((time.perf_counter() - start) * 1000, 3),
+            })
+
+
+def explain(alias, sql, params):
+    """Query plan for one SELECT statement, as a list of lines."""
+    connection = connections[alias]
+    prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            return [' '.join(str(col) for col in row) for row in cursor.fetchall()]
+    except Exception as e:
+        return [f'EXPLAIN failed: {e}']
+
+
+def profile_request(request, get_response):
+    """Run the request under cProfile with SQL recording. Returns (response, capture)."""
+    recorders = [QueryRecorder(alias) for alias in connections]
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    with ExitStack() as stack:
+        for recorder in recorders:
+            stack.enter_context(connections[recorder.alias].execute_wrapper(recorder))
+        profiler.enable()
+        try:
+            response = get_response(request)
+        finally:
+            profiler.disable()
+    total_ms = (time.perf_counter() - start) * 1000
+
+    stats_output = io.StringIO()
+    pstats.Stats(profiler, stream=stats_output).sort_stats('cumulative').print_stats(40)
+
+    slow_ms = getattr(settings, 'RESULTS_PROFILE_SLOW_QUERY_MS', 100)
+    queries = [query for recorder in recorders for query in recorder.queries]
+    for query in queries:
+        raw_params = query.pop('_raw_params')
+        if (
+            query['ms'] >= slow_ms and not query['many']
+            and query['sql'].lstrip().upper().startswith('SELECT')
+            and not SENSITIVE_TABLE.search(query['sql'])
+        ):
+            query['plan'] = explain(query['alias'], query['sql'], raw_params)
+            query['params'] = [str(p) for p in (raw_params or [])]
+
+    capture = {
+        'captured_at': timezone.now().isoformat(),
+        'method': request.method,
+        'path': request.get_full_path(),
+        'status': response.status_code,
+        'total_ms': round(total_ms, 3),
+        'sql_ms': round(sum(query['ms'] for query in queries), 3),
+        'query_count': len(queries),
+        'queries': queries,
+        'profile': stats_output.getvalue(),
+    }
+    return response, capture
+
+
+# =============================================================================
+# Storage (ring buffer of JSON files)
+# =============================================================================
+
+def save_capture(capture):
+    """Write a capture and drop the oldest ones beyond RESULTS_PROFILE_MAX_CAPTURES."""
+    directory = get_profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    name = f"{timezone.now().strftime('%Y%m%d-%H%M%S-%f')}-{uuid.uuid4().hex[:6]}.json"
+    (directory / name).write_text(json.dumps(capture, indent=2), encoding='utf-8')
+
+    keep = getattr(settings, 'RESULTS_PROFILE_MAX_CAPTURES', 50)
+    for old in list_capture_files()[keep:]:
+        old.unlink(missing_ok=True)
+    return name
+
+
+def list_capture_files():
+    """Capture files, newest first (names start with their timestamp)."""
+    directory = get_profile_dir()
+    if not directory.is_dir():
+        return []
+    return sorted(directory.glob('*.json'), reverse=True)
+
+
+def list_captures():
+    """Summaries of the stored captures, newest first."""
+    summaries = []
+    for path in list_capture_files():
+        try:
+            capture = json.loads(path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            continue
+        summaries.append({
+            'name': path.name,
+            'captured_at': capture.get('captured_at'),
+            'method': capture.get('method'),
+            'path': capture.get('path'),
+            'status': capture.get('status'),
+            'total_ms': capture.get('total_ms'),
+            'sql_ms': capture.get('sql_ms'),
+            'query_count': capture.get('query_count'),
+        })
+    return summaries
+
+
+def load_capture(name):
+    """One capture by file name, or None."""
+    if not CAPTURE_NAME.match(name):
+        return None
+    path = get_profile_dir() / name
+    if not path.is_file():
+        return None
+    return json.loads(path.read_text(encoding='utf-8'))
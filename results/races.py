@@ -0,0 +1,186 @@
+"""
+Race Summaries
+==============
+Precomputed "who won where" for every polling unit, ward and LGA.
+
+area_party_totals holds each area's party totals and is updated by delta
+whenever result rows change (see upkeep.py). The area's race_summaries row
+(winner, runner-up, margin, turnout) is then recomputed from those few party
+rows, so nothing ever re-sorts announced_pu_results.
+
+Ranked queries ("closest races in Delta", "top 20 PUs by margin for PDP") are
+index range scans on race_summaries - see top_races().
+Run `python manage.py rebuild_race_summaries` to rebuild both tables.
+"""
+
+from collections import defaultdict
+
+from django.db import connections, router, transaction
+
+from .models import AreaPartyTotal, RaceSummary
+
+
+LEVELS = ('pu', 'ward', 'lga')
+
+
+def summarize(scores):
+    """
+    Winner/runner-up/margin/turnout for {party: score}, or None if no votes.
+    Parties without votes are left out, so a total that dropped to zero after
+    a delete ranks the same as no result at all.
+    """
+    ranked = sorted(((party, score) for party, score in scores.items() if score), key=lambda item: (-item[1], item[0]))
+    if not ranked or ranked[0][1] <= 0:
+        return None
+    winner, winner_score = ranked[0]
+    runner_up, runner_up_score = ranked[1] if len(ranked) > 1 else (None, 0)
+    return {
+        'winner': winner,
+        'winner_score': winner_score,
+        'runner_up': runner_up,
+        'runner_up_score': runner_up_score,
+        'margin': winner_score - runner_up_score,
+        'turnout': sum(scores.values()),
+    }
+
+
+def get_areas(path):
+    """[(level, area_uniqueid)] a polling unit's results count towards, from its path."""
+    areas = [('pu', path.polling_unit_uniqueid), ('lga', path.lga_uniqueid)]
+    if path.ward_uniqueid is not None:
+        areas.append(('ward', path.ward_uniqueid))
+    return areas
+
+
+# =============================================================================
+# Incremental maintenance
+# =============================================================================
+
+def refresh_summaries(areas):
+    """
+    Recompute race summaries from their party totals.
+
+    areas: {(level, area_uniqueid): (state_id, lga_uniqueid)}
+    """
+    if not areas:
+        return
+    scores = defaultdict(dict)
+    existing = {}
+    for level in LEVELS:
+        area_uniqueids = [area_uniqueid for area_level, area_uniqueid in areas if area_level == level]
+        if not area_uniqueids:
+            continue
+        rows = (
+            AreaPartyTotal.objects
+            .filter(level=level, area_uniqueid__in=area_uniqueids)
+            .values_list('area_uniqueid', 'party_abbreviation', 'score')
+        )
+        for area_uniqueid, party, score in rows:
+            scores[(level, area_uniqueid)][party] = score
+        for summary in RaceSummary.objects.filter(level=level, area_uniqueid__in=area_uniqueids):
+            existing[(level, summary.area_uniqueid)] = summary
+
+    created, updated, deleted = [], [], []
+    for (level, area_uniqueid), (state_id, lga_uniqueid) in areas.items():
+        summary = summarize(scores[(level, area_uniqueid)])
+        stored = existing.get((level, area_uniqueid))
+        if summary is None:
+            if stored is not None:
+                deleted.append(stored.pk)
+            continue
+        values = {'state_id': state_id, 'lga_uniqueid': lga_uniqueid, **summary}
+        if stored is None:
+            created.append(RaceSummary(level=level, area_uniqueid=area_uniqueid, **values))
+        else:
+            for field, value in values.items():
+                setattr(stored, field, value)
+            updated.append(stored)
+    if deleted:
+        RaceSummary.objects.filter(pk__in=deleted).delete()
+    if updated:
+        RaceSummary.objects.bulk_update(updated, [
+            'state_id', 'lga_uniqueid', 'winner', 'winner_score', 'runner_up', 'runner_up_score', 'margin', 'turnout',
+        ])
+    if created:
+        RaceSummary.objects.bulk_create(created)
+
+
+# =============================================================================
+# Full computation
+# =============================================================================
+
+def compute_races(connection):
+    """
+    Every area's party totals and race summary, summed from announced_pu_results
+    over polling_unit_path on `connection`.
+
+    Returns (totals, summaries): (level, area_uniqueid, party, score) tuples and
+    dicts of RaceSummary field values.
+    """
+    area_columns = {'pu': 'p.polling_unit_uniqueid', 'ward': 'p.ward_uniqueid', 'lga': 'p.lga_uniqueid'}
+    totals = []
+    summaries = []
+    with connection.cursor() as cursor:
+        for level, column in area_columns.items():
+            cursor.execute(f'''
+                SELECT {column}, MIN(p.state_id), MIN(p.lga_uniqueid),
+                       apr.party_abbreviation, SUM(apr.party_score)
+                FROM polling_unit_path p
+                JOIN announced_pu_results apr ON apr.polling_unit_uniqueid = p.result_key
+                WHERE {column} IS NOT NULL
+                GROUP BY {column}, apr.party_abbreviation
+            ''')
+            scores = defaultdict(dict)
+            locations = {}
+            for area_uniqueid, state_id, lga_uniqueid, party, score in cursor.fetchall():
+                scores[area_uniqueid][party] = score
+                locations[area_uniqueid] = (state_id, lga_uniqueid)
+                totals.append((level, area_uniqueid, party, score))
+            for area_uniqueid, area_scores in scores.items():
+                summary = summarize(area_scores)
+                if summary is not None:
+                    state_id, lga_uniqueid = locations[area_uniqueid]
+                    summaries.append({
+                        'level': level, 'area_uniqueid': area_uniqueid,
+                        'state_id': state_id, 'lga_uniqueid': lga_uniqueid, **summary,
+                    })
+    return totals, summaries
+
+
+def rebuild_races():
+    """Recompute every party total and race summary. Returns the summary count."""
+    totals, summaries = compute_races(connections[router.db_for_read(AreaPartyTotal)])
+    with transaction.atomic(using=router.db_for_write(RaceSummary)):
+        AreaPartyTotal.objects.all().delete()
+        RaceSummary.objects.all().delete()
+        AreaPartyTotal.objects.bulk_create(
+            [
+                AreaPartyTotal(level=level, area_uniqueid=area_uniqueid, party_abbreviation=party, score=score)
+                for level, area_uniqueid, party, score in totals
+            ],
+            batch_size=1000,
+        )
+        RaceSummary.objects.bulk_create([RaceSummary(**summary) for summary in summaries], batch_size=1000)
+    return len(summaries)
+
+
+# =============================================================================
+# Queries
+# =============================================================================
+
+def top_races(state_id, level, order='closest', party=None, lga_uniqueid=None, limit=20):
+    """
+    Top-k races at one level.
+
+    order='closest' gives the smallest margins first, order='margin' the
+    biggest. party limits to races that party won; lga_uniqueid to one LGA
+    (of state_id - an LGA in another state gives no races).
+    """
+    races = RaceSummary.objects.filter(state_id=state_id, level=level)
+    if lga_uniqueid is not None:
+        races = races.filter(lga_uniqueid=lga_uniqueid)
+    if party:
+        races = races.filter(winner=party)
+    # Same column order as the race_summaries indexes, so this is a range scan
+    ordering = ['margin', 'area_uniqueid'] if order == 'closest' else ['-margin', '-area_uniqueid']
+    return list(races.order_by(*ordering)[:limit])
@@ -0,0 +1,121 @@
+"""
+JSON Responses for the API
+==========================
+One place for how the API endpoints encode JSON:
+- orjson when it is installed, the standard library otherwise
+- gzip for bodies over RESULTS_JSON_GZIP_MIN_BYTES when the client accepts it
+- rows_response() streams large row sets instead of building one big list
+
+Views should fetch plain tuples (values_list() or a cursor) and hand them to
+rows_response(), rather than building model instances just to read a few
+fields off them.
+"""
+
+import gzip
+import json
+import re
+import zlib
+from itertools import islice
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+CONTENT_TYPE = 'application/json'
+ACCEPTS_GZIP = re.compile(r'\bgzip\b')
+
+
+def get_gzip_min_bytes():
+    return getattr(settings, 'RESULTS_JSON_GZIP_MIN_BYTES', 1024)
+
+
+def get_stream_min_rows():
+    return getattr(settings, 'RESULTS_JSON_STREAM_MIN_ROWS', 5000)
+
+
+def dumps(data):
+    """Encode data as compact JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(data, default=DjangoJSONEncoder().default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':')).encode('utf-8')
+
+
+def accepts_gzip(request):
+    return request is not None and bool(ACCEPTS_GZIP.search(request.headers.get('Accept-Encoding', '')))
+
+
+def json_response(request, data, status=200):
+    """JSON response for any data, gzipped if it is large and the client accepts gzip."""
+    body = dumps(data)
+    compress = len(body) >= get_gzip_min_bytes() and accepts_gzip(request)
+    if compress:
+        body = gzip.compress(body, compresslevel=6)
+    response = HttpResponse(body, content_type=CONTENT_TYPE, status=status)
+    if compress:
+        response['Content-Encoding'] = 'gzip'
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
+def rows_response(request, columns, rows, status=200):
+    """
+    JSON array of objects from an iterable of tuples, keyed by `columns`.
+
+    Up to RESULTS_JSON_STREAM_MIN_ROWS rows are sent as a normal response;
+    bigger results are streamed in chunks (gzipped on the fly if accepted).
+    """
+    rows = iter(rows)
+    chunk_size = get_stream_min_rows()
+    first = list(islice(rows, chunk_size))
+    if len(first) < chunk_size:
+        return json_response(request, [dict(zip(columns, row)) for row in first], status=status)
+
+    def encode_chunks():
+        yield b'['
+        chunk = first
+        separator = b''
+        while chunk:
+            # Encode the chunk as an array and drop its brackets
+            yield separator + dumps([dict(zip(columns, row)) for row in chunk])[1:-1]
+            separator = b','
+            chunk = list(islice(rows, chunk_size))
+        yield b']'
+
+    compress = accepts_gzip(request)
+    response = StreamingHttpResponse(
+        gzip_stream(encode_chunks()) if compress else encode_chunks(),
+        content_type=CONTENT_TYPE, status=status,
+    )
+    if compress:
+        response['Content-Encoding'] = 'gzip'
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
+def cursor_rows(alias, sql, params=None, batch_size=2000):
+    """Rows of a raw query as plain tuples, fetched lazily in batches."""
+    with connections[alias].cursor() as cursor:
+        cursor.execute(sql, params)
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                return
+            yield from batch
+
+
+def gzip_stream(chunks):
+    """Gzip a stream of byte chunks."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,78 @@
+"""
+Signal handlers that keep derived tables in sync with announced_pu_results.
+
+Connected in ResultsConfig.ready(). Changes go through upkeep.py, which
+applies them at once or, inside upkeep.batched(), once per block. Note that
+queryset.update()/bulk_create() and raw SQL bypass signals - rebuild the
+derived tables after using them.
+"""
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import hierarchy, upkeep
+from .models import AnnouncedPuResults, PollingUnit, PollingUnitPath, Ward, WardPath
+
+
+@receiver(pre_save, sender=AnnouncedPuResults)
+def remember_previous_result(sender, instance, **kwargs):
+    """Keep the stored version of an edited result so we can apply the difference."""
+    instance._previous_result = None
+    if instance.pk is not None:
+        instance._previous_result = (
+            AnnouncedPuResults.objects
+            .filter(pk=instance.pk)
+            .values_list('polling_unit_uniqueid', 'party_abbreviation', 'date_entered', 'party_score')
+            .first()
+        )
+
+
+@receiver(post_save, sender=AnnouncedPuResults)
+def result_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    upkeep.result_written(getattr(instance, '_previous_result', None), (
+        instance.polling_unit_uniqueid, instance.party_abbreviation,
+        instance.date_entered, instance.party_score,
+    ))
+
+
+@receiver(post_delete, sender=AnnouncedPuResults)
+def result_deleted(sender, instance, **kwargs):
+    upkeep.result_written((
+        instance.polling_unit_uniqueid, instance.party_abbreviation,
+        instance.date_entered, instance.party_score,
+    ), None)
+
+
+@receiver(pre_save, sender=PollingUnit)
+def remember_previous_path(sender, instance, **kwargs):
+    """Keep the path the polling unit's results are counted under, in case it moves."""
+    instance._previous_path = None
+    if instance.pk is not None:
+        instance._previous_path = PollingUnitPath.objects.filter(polling_unit_uniqueid=instance.pk).first()
+
+
+@receiver(post_save, sender=PollingUnit)
+def polling_unit_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        hierarchy.update_path(instance)
+        upkeep.polling_unit_changed(instance.uniqueid, getattr(instance, '_previous_path', None))
+
+
+@receiver(post_delete, sender=PollingUnit)
+def polling_unit_deleted(sender, instance, **kwargs):
+    path = PollingUnitPath.objects.filter(polling_unit_uniqueid=instance.uniqueid).first()
+    PollingUnitPath.objects.filter(polling_unit_uniqueid=instance.uniqueid).delete()
+    upkeep.polling_unit_changed(instance.uniqueid, path)
+
+
+@receiver(post_save, sender=Ward)
+def ward_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        hierarchy.update_ward_path(instance)
+
+
+@receiver(post_delete, sender=Ward)
+def ward_deleted(sender, instance, **kwargs):
+    WardPath.objects.filter(ward_uniqueid=instance.uniqueid).delete()
@@ -0,0 +1,283 @@
+"""
+Tests for the derived tables and the JSON APIs.
+
+The hierarchy tables are unmanaged, so no migration creates them in the test
+database - setUpModule() does. The derived tables (paths, race summaries,
+timeline buckets, checksums) are kept up to date by upkeep.py; every upkeep
+test compares them with a full rebuild from announced_pu_results.
+"""
+
+from datetime import datetime, timezone as dt_timezone
+from unittest import mock
+
+from django.db import OperationalError, connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from . import checksums, hierarchy, partitions, races, timeline, upkeep
+from .models import (
+    AgentName, AnnouncedLgaResults, AnnouncedPuResults, AreaPartyTotal, Lga, LgaResultBucket, Party,
+    PollingUnit, PollingUnitPath, RaceSummary, ResultChecksum, State, Ward, WardPath,
+)
+from .partitions import using_state
+
+
+UNMANAGED_MODELS = (AgentName, AnnouncedLgaResults, Lga, Party, PollingUnit, State, Ward)
+
+
+def setUpModule():
+    existing = set(connection.introspection.table_names())
+    with connection.schema_editor() as editor:
+        for model in UNMANAGED_MODELS:
+            if model._meta.db_table not in existing:
+                editor.create_model(model)
+
+
+def tearDownModule():
+    with connection.schema_editor() as editor:
+        for model in UNMANAGED_MODELS:
+            editor.delete_model(model)
+
+
+def at(hour, minute=0):
+    return datetime(2011, 4, 26, hour, minute, tzinfo=dt_timezone.utc)
+
+
+class ResultsTestCase(TestCase):
+    """Two LGAs in Delta (25) and one in Edo (12), one polling unit each."""
+
+    @classmethod
+    def setUpTestData(cls):
+        State.objects.create(state_id=25, state_name='Delta')
+        State.objects.create(state_id=12, state_name='Edo')
+        for partyid in ('PDP', 'ACN', 'LABOUR'):
+            Party.objects.create(partyid=partyid, partyname=partyid)
+
+        cls.lga = Lga.objects.create(lga_id=1, lga_name='Aniocha North', state_id=25)
+        cls.other_lga = Lga.objects.create(lga_id=2, lga_name='Aniocha South', state_id=25)
+        cls.ward = Ward.objects.create(ward_id=1, ward_name='Ezi', lga_id=1)
+        cls.other_ward = Ward.objects.create(ward_id=1, ward_name='Ogwashi', lga_id=2)
+        cls.pu = cls.create_polling_unit('Primary School', cls.ward)
+        cls.other_pu = cls.create_polling_unit('Town Hall', cls.other_ward)
+        for pu, scores in ((cls.pu, {'PDP': 100, 'ACN': 80}), (cls.other_pu, {'PDP': 30, 'ACN': 50})):
+            for party, score in scores.items():
+                cls.create_result(pu, party, score, at(10))
+
+        with using_state(12):
+            cls.edo_lga = Lga.objects.create(lga_id=7, lga_name='Akoko-Edo', state_id=12)
+            cls.edo_ward = Ward.objects.create(ward_id=1, ward_name='Igarra', lga_id=7)
+            cls.edo_pu = cls.create_polling_unit('Market Square', cls.edo_ward)
+            cls.create_result(cls.edo_pu, 'LABOUR', 40, at(11))
+
+    @staticmethod
+    def create_polling_unit(name, ward):
+        return PollingUnit.objects.create(
+            polling_unit_id=0, ward_id=ward.ward_id, lga_id=ward.lga_id, uniquewardid=ward.uniqueid,
+            polling_unit_number=f'PU-{name}', polling_unit_name=name,
+        )
+
+    @staticmethod
+    def create_result(pu, party, score, date_entered):
+        return AnnouncedPuResults.objects.create(
+            polling_unit_uniqueid=str(pu.uniqueid), party_abbreviation=party, party_score=score,
+            entered_by_user='test', date_entered=date_entered, user_ip_address='127.0.0.1',
+        )
+
+
+class UpkeepTests(ResultsTestCase):
+    """Incremental upkeep must leave the same tables as a full rebuild."""
+
+    def snapshot(self):
+        return {
+            'pu_paths': set(PollingUnitPath.objects.values_list(
+                'polling_unit_uniqueid', 'result_key', 'state_id', 'lga_uniqueid', 'ward_uniqueid',
+            )),
+            'ward_paths': set(WardPath.objects.values_list('ward_uniqueid', 'state_id', 'lga_uniqueid')),
+            # Upkeep keeps rows whose score dropped to zero, a rebuild leaves them out
+            'totals': set(
+                AreaPartyTotal.objects.exclude(score=0)
+                .values_list('level', 'area_uniqueid', 'party_abbreviation', 'score')
+            ),
+            'races': set(RaceSummary.objects.values_list(
+                'level', 'area_uniqueid', 'state_id', 'lga_uniqueid', 'winner', 'winner_score',
+                'runner_up', 'runner_up_score', 'margin', 'turnout',
+            )),
+            'buckets': set(
+                LgaResultBucket.objects.exclude(score=0)
+                .values_list('lga_uniqueid', 'party_abbreviation', 'bucket_start', 'score')
+            ),
+            'checksums': set(ResultChecksum.objects.values_list(
+                'level', 'area_uniqueid', 'state_id', 'parent_level', 'parent_uniqueid', 'digest',
+            )),
+        }
+
+    def assertMatchesRebuild(self):
+        incremental = self.snapshot()
+        for state_id in (25, 12):
+            hierarchy.rebuild_paths(state_id)
+        timeline.rebuild_timeline()
+        races.rebuild_races()
+        checksums.rebuild_checksums()
+        rebuilt = self.snapshot()
+        for table in incremental:
+            self.assertEqual(incremental[table], rebuilt[table], table)
+
+    def get_total(self, level, area_uniqueid, party):
+        return (
+            AreaPartyTotal.objects
+            .filter(level=level, area_uniqueid=area_uniqueid, party_abbreviation=party)
+            .values_list('score', flat=True)
+            .first()
+        )
+
+    def test_initial_data(self):
+        self.assertEqual(self.get_total('lga', self.lga.uniqueid, 'PDP'), 100)
+        self.assertEqual(RaceSummary.objects.get(level='pu', area_uniqueid=self.other_pu.uniqueid).winner, 'ACN')
+        self.assertEqual(PollingUnitPath.objects.get(polling_unit_uniqueid=self.edo_pu.uniqueid).state_id, 12)
+        self.assertMatchesRebuild()
+
+    def test_insert_in_batch(self):
+        with upkeep.batched():
+            pu = self.create_polling_unit('New School', self.ward)
+            for party, score in (('PDP', 5), ('ACN', 9), ('LABOUR', 9)):
+                self.create_result(pu, party, score, at(12, 7))
+        self.assertEqual(self.get_total('ward', self.ward.uniqueid, 'ACN'), 89)
+        self.assertEqual(RaceSummary.objects.get(level='pu', area_uniqueid=pu.uniqueid).margin, 0)
+        self.assertMatchesRebuild()
+
+    def test_edit(self):
+        result = AnnouncedPuResults.objects.get(polling_unit_uniqueid=str(self.pu.uniqueid), party_abbreviation='ACN')
+        result.party_score = 150
+        result.date_entered = at(13)
+        result.save()
+        self.assertEqual(RaceSummary.objects.get(level='pu', area_uniqueid=self.pu.uniqueid).winner, 'ACN')
+        self.assertMatchesRebuild()
+
+        result.polling_unit_uniqueid = str(self.other_pu.uniqueid)
+        result.party_abbreviation = 'LABOUR'
+        result.save()
+        self.assertEqual(self.get_total('pu', self.pu.uniqueid, 'ACN'), 0)
+        self.assertMatchesRebuild()
+
+    def test_delete(self):
+        AnnouncedPuResults.objects.get(polling_unit_uniqueid=str(self.pu.uniqueid), party_abbreviation='PDP').delete()
+        self.assertEqual(self.get_total('lga', self.lga.uniqueid, 'PDP'), 0)
+        self.assertMatchesRebuild()
+
+        with upkeep.batched():
+            for result in AnnouncedPuResults.objects.filter(polling_unit_uniqueid=str(self.pu.uniqueid)):
+                result.delete()
+        self.assertFalse(RaceSummary.objects.filter(level='pu', area_uniqueid=self.pu.uniqueid).exists())
+        self.assertMatchesRebuild()
+
+    def test_polling_unit_move(self):
+        self.pu.lga_id = self.other_ward.lga_id
+        self.pu.uniquewardid = self.other_ward.uniqueid
+        self.pu.save()
+        self.assertEqual(self.get_total('lga', self.lga.uniqueid, 'PDP'), 0)
+        self.assertEqual(self.get_total('lga', self.other_lga.uniqueid, 'PDP'), 130)
+        self.assertMatchesRebuild()
+
+        with upkeep.batched():
+            self.pu.lga_id = self.ward.lga_id
+            self.pu.uniquewardid = self.ward.uniqueid
+            self.pu.save()
+            self.create_result(self.pu, 'LABOUR', 7, at(14))
+        self.assertEqual(self.get_total('ward', self.ward.uniqueid, 'LABOUR'), 7)
+        self.assertMatchesRebuild()
+
+    def test_polling_unit_delete(self):
+        self.other_pu.delete()
+        self.assertFalse(RaceSummary.objects.filter(level='lga', area_uniqueid=self.other_lga.uniqueid).exists())
+        self.assertMatchesRebuild()
+
+    def test_savepoint_rollback(self):
+        with upkeep.batched():
+            self.create_result(self.pu, 'LABOUR', 11, at(15))
+            try:
+                with upkeep.batched():
+                    self.create_result(self.pu, 'LABOUR', 1000, at(15))
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertEqual(self.get_total('pu', self.pu.uniqueid, 'LABOUR'), 11)
+        self.assertMatchesRebuild()
+
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    self.create_result(self.pu, 'PDP', 1000, at(15))
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertEqual(self.get_total('pu', self.pu.uniqueid, 'PDP'), 100)
+        self.assertMatchesRebuild()
+
+    def test_add_results_stores_nothing_if_upkeep_fails(self):
+        post = {
+            'lga_id': self.lga.uniqueid, 'ward_id': self.ward.ward_id, 'pu_name': 'Failing PU', 'state_id': 25,
+            'party_PDP': '5', 'party_ACN': '6', 'party_LABOUR': '7',
+        }
+        with mock.patch.object(races, 'refresh_summaries', side_effect=OperationalError('database is locked')):
+            self.client.post('/add-results/', post)
+        self.assertFalse(PollingUnit.objects.filter(polling_unit_name='Failing PU').exists())
+        self.assertMatchesRebuild()
+
+        response = self.client.post('/add-results/', post)
+        self.assertEqual(response.status_code, 302)
+        pu = PollingUnit.objects.get(polling_unit_name='Failing PU')
+        self.assertEqual(RaceSummary.objects.get(level='pu', area_uniqueid=pu.uniqueid).winner, 'LABOUR')
+        self.assertMatchesRebuild()
+
+
+class ApiTests(ResultsTestCase):
+
+    def test_batch_query_count_does_not_grow_with_ids(self):
+        counts = []
+        for ids in ([self.pu.uniqueid], [self.pu.uniqueid, self.other_pu.uniqueid, 999999]):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get('/api/polling-unit-results/', {'ids': ','.join(map(str, ids))})
+            self.assertEqual(response.status_code, 200)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+        self.assertLessEqual(counts[0], 3)
+
+    def test_batch_rejects_too_many_ids(self):
+        with self.settings(RESULTS_BATCH_MAX_POLLING_UNITS=2):
+            response = self.client.get('/api/polling-unit-results/', {'ids': '1,2,3'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_as_of(self):
+        url = f'/api/lga-results/{self.lga.uniqueid}/as-of/'
+        response = self.client.get(url, {'at': '2011-04-26T12:00:00+00:00'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['total_votes'], 180)
+        response = self.client.get(url, {'at': '2011-04-26T09:00:00+00:00'})
+        self.assertEqual(response.json()['total_votes'], 0)
+        for value in ('yesterday', '2011-02-30T10:00:00'):
+            self.assertEqual(self.client.get(url, {'at': value}).status_code, 400)
+
+    def test_races_limit_is_clamped(self):
+        for limit, expected in (('0', 1), ('-3', 1), ('1000', 2)):
+            response = self.client.get('/api/races/', {'level': 'pu', 'limit': limit})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.json()), expected)
+        self.assertEqual(self.client.get('/api/races/', {'limit': 'many'}).status_code, 400)
+
+    def test_races_stay_in_the_state(self):
+        response = self.client.get('/api/races/', {'level': 'pu', 'lga_id': self.edo_lga.uniqueid})
+        self.assertEqual(response.json(), [])
+        response = self.client.get('/api/races/', {'level': 'pu', 'lga_id': self.edo_lga.uniqueid, 'state_id': 12})
+        self.assertEqual([race['uniqueid'] for race in response.json()], [self.edo_pu.uniqueid])
+
+    def test_party_totals_states(self):
+        # fan_out() queries from worker threads, which cannot see the test transaction
+        with mock.patch.object(partitions, 'party_totals_across_states', return_value=({}, {})) as totals:
+            response = self.client.get('/api/party-totals/', {'states': '25,25,999'})
+            self.assertEqual(response.status_code, 200)
+            totals.assert_called_once_with([25])
+            with self.settings(RESULTS_PARTY_TOTALS_MAX_STATES=1):
+                response = self.client.get('/api/party-totals/', {'states': '25,12'})
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(self.client.get('/api/party-totals/', {'states': 'x'}).status_code, 400)
+        self.assertEqual(partitions.state_party_totals(25), {'PDP': 130, 'ACN': 130})
@@ -0,0 +1,138 @@
+"""
+Results Timeline
+================
+Time-bucketed LGA totals, so we can answer "what were the results at time T?"
+without re-summing announced_pu_results.
+
+Every result row adds its party_score to one LgaResultBucket row:
+    (lga_uniqueid, party_abbreviation, bucket_start) += party_score
+where bucket_start is date_entered rounded down to RESULTS_TIMELINE_BUCKET_SECONDS
+and the LGA comes from the polling unit's path (see hierarchy.py), since
+lga_id alone is ambiguous across states.
+
+The buckets are kept up to date on every result write (see upkeep.py).
+Run `python manage.py rebuild_result_timeline` to (re)build them from scratch,
+e.g. after loading data with raw SQL or changing the bucket size.
+"""
+
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import AnnouncedPuResults, LgaResultBucket, PollingUnitPath
+
+
+DEFAULT_BUCKET_SECONDS = 300  # 5 minutes
+
+
+def get_bucket_seconds():
+    """Size of a timeline bucket in seconds."""
+    return getattr(settings, 'RESULTS_TIMELINE_BUCKET_SECONDS', DEFAULT_BUCKET_SECONDS)
+
+
+def bucket_start(moment):
+    """Round a datetime down to the start of its bucket (returned in UTC)."""
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    seconds = get_bucket_seconds()
+    epoch = int(moment.timestamp())
+    start = datetime.fromtimestamp(epoch - epoch % seconds, tz=dt_timezone.utc)
+    return start if settings.USE_TZ else timezone.make_naive(start)
+
+
+# =============================================================================
+# Full computation
+# =============================================================================
+
+def compute_buckets(paths, rows):
+    """
+    Sum result rows into buckets.
+
+    paths: (result_key, lga_uniqueid) tuples from polling_unit_path
+    rows:  (polling_unit_uniqueid, party_abbreviation, date_entered, party_score)
+
+    Returns {(lga_uniqueid, party_abbreviation, bucket_start): score}; rows
+    without a date or a path are skipped.
+    """
+    lga_uniqueids = dict(paths)
+    totals = defaultdict(int)
+    for polling_unit_uniqueid, party, date_entered, score in rows:
+        lga_uniqueid = lga_uniqueids.get(polling_unit_uniqueid)
+        if lga_uniqueid is not None and date_entered is not None:
+            totals[(lga_uniqueid, party, bucket_start(date_entered))] += score
+    return totals
+
+
+def rebuild_timeline():
+    """Recompute every bucket from announced_pu_results. Returns the bucket count."""
+    totals = compute_buckets(
+        PollingUnitPath.objects.values_list('result_key', 'lga_uniqueid'),
+        AnnouncedPuResults.objects
+        .filter(date_entered__isnull=False)
+        .values_list('polling_unit_uniqueid', 'party_abbreviation', 'date_entered', 'party_score')
+        .iterator(chunk_size=5000),
+    )
+    with transaction.atomic(using=router.db_for_write(LgaResultBucket)):
+        LgaResultBucket.objects.all().delete()
+        LgaResultBucket.objects.bulk_create(
+            [
+                LgaResultBucket(lga_uniqueid=lga_uniqueid, party_abbreviation=party, bucket_start=start, score=score)
+                for (lga_uniqueid, party, start), score in totals.items()
+            ],
+            batch_size=1000,
+        )
+    return len(totals)
+
+
+# =============================================================================
+# Queries
+# =============================================================================
+
+def results_as_of(lga_uniqueid, moment):
+    """
+    Cumulative party totals for an LGA as they stood at `moment`.
+
+    Resolution is one bucket: results are counted if their bucket ended at or
+    before `moment`. Returns (as_of, [(party, total), ...]) sorted by total.
+    """
+    cutoff = bucket_start(moment)
+    rows = (
+        LgaResultBucket.objects
+        .filter(lga_uniqueid=lga_uniqueid, bucket_start__lt=cutoff)
+        .values_list('party_abbreviation')
+        .annotate(total=Sum('score'))
+        .order_by('-total', 'party_abbreviation')
+    )
+    return cutoff, list(rows)
+
+
+def lga_timeline(lga_uniqueid):
+    """
+    Cumulative party totals at the end of every bucket that had results.
+
+    Returns a list of (bucket_end, {party: cumulative_total}) in time order,
+    built from a single ordered scan of the LGA's buckets.
+    """
+    size = timedelta(seconds=get_bucket_seconds())
+    running = {}
+    timeline = []
+    current_end = None
+    rows = (
+        LgaResultBucket.objects
+        .filter(lga_uniqueid=lga_uniqueid)
+        .order_by('bucket_start')
+        .values_list('bucket_start', 'party_abbreviation', 'score')
+    )
+    for start, party, score in rows:
+        end = start + size
+        if current_end is not None and end != current_end:
+            timeline.append((current_end, dict(running)))
+        current_end = end
+        running[party] = running.get(party, 0) + score
+    if current_end is not None:
+        timeline.append((current_end, dict(running)))
+    return timeline
@@ -0,0 +1,237 @@
+"""
+Derived Table Upkeep
+====================
+Every result write changes the race summaries (races.py), the timeline
+buckets (timeline.py) and the checksum tree (checksums.py). signals.py hands
+each write to this module, which applies it right away - in the same
+transaction as the write itself.
+
+Updating the tables row by row costs dozens of queries per result, so code
+that writes many results at once wraps them in batched():
+
+    with upkeep.batched():
+        ...create the polling unit and its results...
+
+Inside the block the changes are queued instead:
+
+- each result row becomes (area, party) and (LGA, party, bucket) deltas,
+  summed in memory - the polling unit's path is looked up once per batch;
+- a polling unit that moves to another LGA or ward takes its results along:
+  they are subtracted under its old path and added under the new one;
+- at the end of the block, still inside its transaction, each table gets its
+  deltas in one pass (a single UPDATE for the rows that exist, one bulk INSERT
+  for the rest), every touched race summary is recomputed once, and every
+  touched checksum node is rehashed once.
+
+batched() is an atomic block, so the derived rows commit or roll back with the
+data. Nested batched() blocks are savepoints: one that fails drops its queued
+changes along with its writes. A plain transaction.atomic() savepoint that is
+rolled back inside batched() cannot drop what it queued - use batched() there.
+"""
+
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import IntegrityError, router, transaction
+from django.db.models import BigIntegerField, Case, F, Q, Value, When
+
+from . import checksums, races, timeline
+from .models import AnnouncedPuResults, AreaPartyTotal, LgaResultBucket, PollingUnitPath
+from .partitions import get_current_state_id, using_state
+
+
+# The open batched() blocks, innermost last
+_open_batches = ContextVar('results_upkeep_batches', default=())
+
+
+class Batch:
+    """Derived-table changes queued in one batched() block."""
+
+    def __init__(self, using):
+        self.using = using
+        self.state_id = get_current_state_id()
+        self.paths = {}  # result_key -> PollingUnitPath or None
+        self.totals = defaultdict(int)  # (level, area_uniqueid, party) -> delta
+        self.areas = {}  # (level, area_uniqueid) -> (state_id, lga_uniqueid)
+        self.buckets = defaultdict(int)  # (lga_uniqueid, party, bucket_start) -> delta
+        self.state_ids = set()  # checksum roots to lock
+        self.polling_units = set()  # result_keys to rehash
+        self.app_writes = defaultdict(int)  # result_key -> rows written
+
+    def get_path(self, polling_unit_uniqueid):
+        result_key = str(polling_unit_uniqueid)
+        if result_key not in self.paths:
+            self.paths[result_key] = PollingUnitPath.objects.filter(result_key=result_key).first()
+        path = self.paths[result_key]
+        if path is not None:
+            self.state_ids.add(path.state_id)
+        return path
+
+    def add_result(self, path, party_abbreviation, date_entered, score):
+        """Queue one result row's score (negative to remove it) under a path."""
+        if path is None or not score:
+            return
+        location = (path.state_id, path.lga_uniqueid)
+        for area in races.get_areas(path):
+            self.totals[(*area, party_abbreviation)] += score
+            self.areas[area] = location
+        if date_entered is not None:
+            self.buckets[(path.lga_uniqueid, party_abbreviation, timeline.bucket_start(date_entered))] += score
+
+    def merge(self, other):
+        """Take over the changes of a nested batch that completed."""
+        for key, delta in other.totals.items():
+            self.totals[key] += delta
+        for key, delta in other.buckets.items():
+            self.buckets[key] += delta
+        for key, writes in other.app_writes.items():
+            self.app_writes[key] += writes
+        self.areas.update(other.areas)
+        self.state_ids |= other.state_ids
+        self.polling_units |= other.polling_units
+
+    def __call__(self):
+        with using_state(self.state_id), transaction.atomic(using=self.using):
+            checksums.lock_roots(self.state_ids)
+            add_scores(AreaPartyTotal, ('level', 'area_uniqueid', 'party_abbreviation'), self.totals)
+            races.refresh_summaries(self.areas)
+            add_scores(LgaResultBucket, ('lga_uniqueid', 'party_abbreviation', 'bucket_start'), self.buckets)
+            checksums.update_polling_units(self.polling_units)
+            checksums.record_app_writes(self.app_writes)
+
+
+@contextmanager
+def batched(using=None):
+    """
+    Atomic block whose derived-table changes are queued and applied once, at
+    its end and inside its transaction. using defaults to the current state's
+    results database.
+    """
+    if using is None:
+        using = router.db_for_write(AnnouncedPuResults)
+    outer = _open_batches.get()
+    batch = Batch(using)
+    with transaction.atomic(using=using):
+        token = _open_batches.set(outer + (batch,))
+        try:
+            yield batch
+        finally:
+            _open_batches.reset(token)
+        parent = find_batch(outer, using)
+        if parent is None:
+            batch()
+        else:
+            parent.merge(batch)
+
+
+def find_batch(batches, using):
+    """The innermost of batches for database using, if any."""
+    for batch in reversed(batches):
+        if batch.using == using:
+            return batch
+    return None
+
+
+def get_batch():
+    """The innermost open batch for this write, or a new one to apply at once."""
+    using = router.db_for_write(AnnouncedPuResults)
+    return find_batch(_open_batches.get(), using) or Batch(using)
+
+
+def apply(batch):
+    """Run a batch now, unless a batched() block will."""
+    if batch not in _open_batches.get():
+        batch()
+
+
+# =============================================================================
+# Queueing (called from signals.py)
+# =============================================================================
+
+def result_written(old_row, new_row):
+    """
+    Queue a result row write. old_row and new_row are (polling_unit_uniqueid,
+    party_abbreviation, date_entered, party_score) before and after; old_row
+    is None for an insert, new_row for a delete.
+    """
+    batch = get_batch()
+    for row, sign in ((old_row, -1), (new_row, 1)):
+        if row is not None:
+            polling_unit_uniqueid, party_abbreviation, date_entered, score = row
+            path = batch.get_path(polling_unit_uniqueid)
+            batch.add_result(path, party_abbreviation, date_entered, sign * score)
+            batch.polling_units.add(str(polling_unit_uniqueid))
+    # Counted the same way as the result_write_log triggers: once per polling unit the row was under
+    for key in {str(row[0]) for row in (old_row, new_row) if row is not None}:
+        batch.app_writes[key] += 1
+    apply(batch)
+
+
+def polling_unit_changed(polling_unit_uniqueid, old_path):
+    """
+    Queue a polling unit being saved or deleted. old_path is the path its
+    results were counted under before; if the new one differs (or is gone),
+    its results are moved from the old areas to the new ones.
+    """
+    batch = get_batch()
+    result_key = str(polling_unit_uniqueid)
+    # Its path may have changed: make every open batch look it up again
+    for other in _open_batches.get():
+        other.paths.pop(result_key, None)
+    new_path = batch.get_path(result_key)
+    if get_place(old_path) != get_place(new_path):
+        if old_path is not None:
+            batch.state_ids.add(old_path.state_id)
+        rows = (
+            AnnouncedPuResults.objects
+            .filter(polling_unit_uniqueid=result_key)
+            .values_list('party_abbreviation', 'date_entered', 'party_score')
+        )
+        for party, date_entered, score in rows:
+            batch.add_result(old_path, party, date_entered, -score)
+            batch.add_result(new_path, party, date_entered, score)
+    batch.polling_units.add(result_key)
+    apply(batch)
+
+
+def get_place(path):
+    return None if path is None else (path.state_id, path.lga_uniqueid, path.ward_uniqueid)
+
+
+# =============================================================================
+# Applying deltas
+# =============================================================================
+
+def add_scores(model, key_fields, deltas, chunk_size=200):
+    """
+    Add {key: delta} to model.score, where key holds the values of key_fields:
+    one UPDATE for the rows that exist and one bulk INSERT for the rest.
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    keys = list(deltas)
+    for start in range(0, len(keys), chunk_size):
+        chunk = keys[start:start + chunk_size]
+        lookup = Q()
+        for key in chunk:
+            lookup |= Q(**dict(zip(key_fields, key)))
+        existing = {tuple(row[1:]): row[0] for row in model.objects.filter(lookup).values_list('pk', *key_fields)}
+        if existing:
+            model.objects.filter(pk__in=existing.values()).update(score=F('score') + Case(
+                *[When(pk=pk, then=Value(deltas[key])) for key, pk in existing.items()],
+                output_field=BigIntegerField(),
+            ))
+        missing = [key for key in chunk if key not in existing]
+        if not missing:
+            continue
+        try:
+            with transaction.atomic(using=router.db_for_write(model)):
+                model.objects.bulk_create(
+                    [model(**dict(zip(key_fields, key)), score=deltas[key]) for key in missing]
+                )
+        except IntegrityError:
+            # Another transaction created some of them first
+            for key in missing:
+                row = model.objects.filter(**dict(zip(key_fields, key)))
+                if not row.update(score=F('score') + deltas[key]):
+                    model.objects.create(**dict(zip(key_fields, key)), score=deltas[key])
@@ -16,4 +16,22 @@ urlpatterns = [
     # API endpoints for AJAX (chained dropdowns)
     path('api/wards/<int:lga_uniqueid>/', views.api_get_wards, name='api_wards'),
     path('api/polling-units/<int:lga_uniqueid>/', views.api_get_polling_units, name='api_polling_units'),
+
+    # API endpoint for batched polling unit results
+    path('api/polling-unit-results/', views.api_polling_unit_results, name='api_polling_unit_results'),
+
+    # API endpoints for the results timeline
+    path('api/lga-results/<int:lga_uniqueid>/as-of/', views.api_lga_results_as_of, name='api_lga_results_as_of'),
+    path('api/lga-results/<int:lga_uniqueid>/timeline/', views.api_lga_results_timeline,
+         name='api_lga_results_timeline'),
+
+    # API endpoint for totals across states
+    path('api/party-totals/', views.api_party_totals, name='api_party_totals'),
+
+    # API endpoint for ranked races (closest races, biggest margins)
+    path('api/races/', views.api_races, name='api_races'),
+
+    # Request profiler captures (staff only)
+    path('profiles/', views.profile_list, name='profile_list'),
+    path('profiles/<str:name>/', views.profile_detail, name='profile_detail'),
 ]
\ No newline at end of file
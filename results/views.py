@@ -7,12 +7,20 @@ This file contains all the views to handle the three questions:
 3. Store results for ALL parties for a new polling unit
 """
 
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import JsonResponse
+from django.http import Http404
 from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db import connections, router
 from django.db.models import Sum
 from django.utils import timezone
-from .models import State, Lga, Ward, PollingUnit, Party, AnnouncedPuResults
+from django.utils.dateparse import parse_datetime
+from .models import (
+    State, Lga, Ward, WardPath, PollingUnit, PollingUnitPath, Party, AnnouncedPuResults, RaceSummary,
+)
+from . import checksums, partitions, profiling, races, timeline, upkeep
+from .responses import cursor_rows, json_response, rows_response
 
 
 def index(request):
@@ -27,22 +35,24 @@ def index(request):
 def polling_unit_results(request):
     """
     Question 1: Display the result for any individual polling unit.
-    User can select a polling unit from Delta State (state_id = 25).
+    User can select a polling unit from the current state (Delta by default).
     """
-    # Get all LGAs in Delta State (state_id = 25)
-    lgas = Lga.objects.filter(state_id=25).order_by('lga_name')
+    state_id = get_state_id(request)
+    lgas = Lga.objects.filter(state_id=state_id).order_by('lga_name')
     
-    # Get all polling units in Delta State with their LGA and Ward names
-    # Using raw SQL for the join since we're not using ForeignKey relations
+    # Get all polling units in the state with their LGA and Ward names
+    # Using raw SQL for the join since we're not using ForeignKey relations;
+    # polling_unit_path links each PU to its LGA and ward (see hierarchy.py)
     polling_units = PollingUnit.objects.raw('''
         SELECT pu.uniqueid, pu.polling_unit_name, pu.polling_unit_number, 
                l.lga_name, w.ward_name
-        FROM polling_unit pu
-        JOIN lga l ON pu.lga_id = l.lga_id AND l.state_id = 25
-        LEFT JOIN ward w ON pu.ward_id = w.ward_id AND pu.lga_id = w.lga_id
-        WHERE pu.polling_unit_name IS NOT NULL AND pu.polling_unit_name != ''
+        FROM polling_unit_path p
+        JOIN polling_unit pu ON pu.uniqueid = p.polling_unit_uniqueid
+        JOIN lga l ON l.uniqueid = p.lga_uniqueid
+        LEFT JOIN ward w ON w.uniqueid = p.ward_uniqueid
+        WHERE p.state_id = %s AND pu.polling_unit_name IS NOT NULL AND pu.polling_unit_name != ''
         ORDER BY l.lga_name, pu.polling_unit_name
-    ''')
+    ''', [state_id])
     
     results = None
     selected_pu = None
@@ -56,11 +66,12 @@ def polling_unit_results(request):
             # Get polling unit details
             selected_pu = PollingUnit.objects.raw('''
                 SELECT pu.*, l.lga_name, w.ward_name
-                FROM polling_unit pu
-                JOIN lga l ON pu.lga_id = l.lga_id
-                LEFT JOIN ward w ON pu.ward_id = w.ward_id AND pu.lga_id = w.lga_id
-                WHERE pu.uniqueid = %s
-            ''', [pu_id])[0]
+                FROM polling_unit_path p
+                JOIN polling_unit pu ON pu.uniqueid = p.polling_unit_uniqueid
+                JOIN lga l ON l.uniqueid = p.lga_uniqueid
+                LEFT JOIN ward w ON w.uniqueid = p.ward_uniqueid
+                WHERE p.polling_unit_uniqueid = %s AND p.state_id = %s
+            ''', [pu_id, state_id])[0]
             
             # Get results for this polling unit
             results = AnnouncedPuResults.objects.filter(
@@ -79,6 +90,7 @@ def polling_unit_results(request):
         'results': results,
         'selected_pu': selected_pu,
         'total_votes': total_votes,
+        'state_id': state_id,
     }
     return render(request, 'results/polling_unit_results.html', context)
 
@@ -96,11 +108,14 @@ def lga_results(request):
     Instead, we sum up results from announced_pu_results for all polling 
     units in the selected LGA.
     """
-    # Get all LGAs in Delta State (state_id = 25)
-    lgas = Lga.objects.filter(state_id=25).order_by('lga_name')
+    state_id = get_state_id(request)
+    lgas = Lga.objects.filter(state_id=state_id).order_by('lga_name')
     
     results = None
     selected_lga = None
+    race = None
+    state_checksum = None
+    lga_checksum = None
     total_votes = 0
     polling_unit_count = 0
     
@@ -110,30 +125,36 @@ def lga_results(request):
     if lga_uniqueid:
         try:
             # Get LGA details
-            selected_lga = Lga.objects.get(uniqueid=lga_uniqueid)
-            lga_id = selected_lga.lga_id
+            selected_lga = Lga.objects.get(uniqueid=lga_uniqueid, state_id=state_id)
             
             # Count polling units in this LGA
-            polling_unit_count = PollingUnit.objects.filter(lga_id=lga_id).count()
+            polling_unit_count = PollingUnitPath.objects.filter(lga_uniqueid=selected_lga.uniqueid).count()
             
             # Sum results from all polling units in this LGA
-            # This joins polling_unit with announced_pu_results
+            # This joins polling_unit_path with announced_pu_results
             results = AnnouncedPuResults.objects.raw('''
                 SELECT 
                     1 as result_id,
                     apr.party_abbreviation,
                     SUM(apr.party_score) as total_score
-                FROM announced_pu_results apr
-                JOIN polling_unit pu ON apr.polling_unit_uniqueid = CAST(pu.uniqueid AS TEXT)
-                WHERE pu.lga_id = %s
+                FROM polling_unit_path p
+                JOIN announced_pu_results apr ON apr.polling_unit_uniqueid = p.result_key
+                WHERE p.lga_uniqueid = %s
                 GROUP BY apr.party_abbreviation
                 ORDER BY total_score DESC
-            ''', [lga_id])
+            ''', [selected_lga.uniqueid])
             
             # Convert to list and calculate total
             results = list(results)
             total_votes = sum(r.total_score for r in results) if results else 0
             
+            # Precomputed winner and margin (see races.py)
+            race = RaceSummary.objects.filter(level='lga', area_uniqueid=selected_lga.uniqueid).first()
+            
+            # Checksum tree digests (see checksums.py) for auditors to compare
+            state_checksum = checksums.get_digest('state', state_id)
+            lga_checksum = checksums.get_digest('lga', selected_lga.uniqueid)
+            
         except Lga.DoesNotExist:
             messages.error(request, 'LGA not found.')
     
@@ -143,6 +164,10 @@ def lga_results(request):
         'selected_lga': selected_lga,
         'total_votes': total_votes,
         'polling_unit_count': polling_unit_count,
+        'race': race,
+        'state_checksum': state_checksum,
+        'lga_checksum': lga_checksum,
+        'state_id': state_id,
     }
     return render(request, 'results/lga_results.html', context)
 
@@ -159,8 +184,9 @@ def add_results(request):
     # Get all parties
     parties = Party.objects.all().order_by('partyname')
     
-    # Get all LGAs in Delta State
-    lgas = Lga.objects.filter(state_id=25).order_by('lga_name')
+    # Get all LGAs in the current state
+    state_id = get_state_id(request)
+    lgas = Lga.objects.filter(state_id=state_id).order_by('lga_name')
     
     if request.method == 'POST':
         # Get form data
@@ -176,43 +202,56 @@ def add_results(request):
         else:
             try:
                 # Get the actual lga_id from the uniqueid
-                lga = Lga.objects.get(uniqueid=lga_uniqueid)
+                lga = Lga.objects.get(uniqueid=lga_uniqueid, state_id=state_id)
                 actual_lga_id = lga.lga_id
-                
-                # Create new polling unit
-                new_pu = PollingUnit.objects.create(
-                    polling_unit_id=0,
-                    ward_id=int(ward_id),
-                    lga_id=actual_lga_id,
-                    polling_unit_number=pu_number or None,
-                    polling_unit_name=pu_name,
-                    entered_by_user=entered_by,
-                    date_entered=timezone.now(),
-                    user_ip_address=get_client_ip(request)
+                ward = (
+                    Ward.objects
+                    .filter(
+                        uniqueid__in=WardPath.objects.filter(lga_uniqueid=lga.uniqueid).values('ward_uniqueid'),
+                        ward_id=int(ward_id),
+                    )
+                    .order_by('uniqueid')
+                    .first()
                 )
                 
-                # Store results for ALL parties
-                results_added = 0
-                for party in parties:
-                    party_abbr = party.partyid
-                    score_key = f'party_{party_abbr}'
-                    score = request.POST.get(score_key, 0)
-                    
-                    try:
-                        score = int(score) if score else 0
-                    except ValueError:
-                        score = 0
-                    
-                    # Create result for this party
-                    AnnouncedPuResults.objects.create(
-                        polling_unit_uniqueid=str(new_pu.uniqueid),
-                        party_abbreviation=party_abbr,
-                        party_score=score,
+                # The polling unit, its results and the derived tables (see upkeep.py)
+                # are written in one transaction: all of it is stored, or none of it
+                with upkeep.batched(using=router.db_for_write(PollingUnit)):
+                    # Create new polling unit
+                    new_pu = PollingUnit.objects.create(
+                        polling_unit_id=0,
+                        ward_id=int(ward_id),
+                        lga_id=actual_lga_id,
+                        uniquewardid=ward.uniqueid if ward else None,
+                        polling_unit_number=pu_number or None,
+                        polling_unit_name=pu_name,
                         entered_by_user=entered_by,
                         date_entered=timezone.now(),
                         user_ip_address=get_client_ip(request)
                     )
-                    results_added += 1
+                
+                    # Store results for ALL parties
+                    results_added = 0
+                    for party in parties:
+                        party_abbr = party.partyid
+                        score_key = f'party_{party_abbr}'
+                        score = request.POST.get(score_key, 0)
+                    
+                        try:
+                            score = int(score) if score else 0
+                        except ValueError:
+                            score = 0
+                    
+                        # Create result for this party
+                        AnnouncedPuResults.objects.create(
+                            polling_unit_uniqueid=str(new_pu.uniqueid),
+                            party_abbreviation=party_abbr,
+                            party_score=score,
+                            entered_by_user=entered_by,
+                            date_entered=timezone.now(),
+                            user_ip_address=get_client_ip(request)
+                        )
+                        results_added += 1
                 
                 messages.success(
                     request, 
@@ -220,7 +259,7 @@ def add_results(request):
                 )
                 
                 # Redirect to view the new polling unit's results
-                return redirect(f'/polling-unit-results/?pu_id={new_pu.uniqueid}')
+                return redirect(f'/polling-unit-results/?pu_id={new_pu.uniqueid}&state_id={state_id}')
                 
             except Lga.DoesNotExist:
                 messages.error(request, 'Invalid LGA selected.')
@@ -230,6 +269,7 @@ def add_results(request):
     context = {
         'lgas': lgas,
         'parties': parties,
+        'state_id': state_id,
     }
     return render(request, 'results/add_results.html', context)
 
@@ -241,55 +281,297 @@ def add_results(request):
 def api_get_wards(request, lga_uniqueid):
     """API endpoint to get wards for a specific LGA."""
     try:
-        lga = Lga.objects.get(uniqueid=lga_uniqueid)
-        wards = Ward.objects.filter(lga_id=lga.lga_id).order_by('ward_name')
-        
-        data = [
-            {
-                'uniqueid': w.uniqueid,
-                'ward_id': w.ward_id,
-                'ward_name': w.ward_name
-            }
-            for w in wards
-        ]
-        return JsonResponse(data, safe=False)
+        lga = Lga.objects.get(uniqueid=lga_uniqueid, state_id=get_state_id(request))
+        columns = ('uniqueid', 'ward_id', 'ward_name')
+        wards = (
+            Ward.objects
+            .filter(uniqueid__in=WardPath.objects.filter(lga_uniqueid=lga.uniqueid).values('ward_uniqueid'))
+            .order_by('ward_name')
+            .values_list(*columns)
+        )
+        return rows_response(request, columns, wards)
     
     except Lga.DoesNotExist:
-        return JsonResponse([], safe=False)
+        return json_response(request, [])
 
 
 def api_get_polling_units(request, lga_uniqueid):
     """API endpoint to get polling units for a specific LGA."""
     try:
-        lga = Lga.objects.get(uniqueid=lga_uniqueid)
+        lga = Lga.objects.get(uniqueid=lga_uniqueid, state_id=get_state_id(request))
         
-        polling_units = PollingUnit.objects.raw('''
+        # Plain tuples straight from the cursor - no PollingUnit instances
+        polling_units = cursor_rows(router.db_for_read(PollingUnit), '''
             SELECT pu.uniqueid, pu.polling_unit_name, pu.polling_unit_number, w.ward_name
-            FROM polling_unit pu
-            LEFT JOIN ward w ON pu.ward_id = w.ward_id AND pu.lga_id = w.lga_id
-            WHERE pu.lga_id = %s AND pu.polling_unit_name IS NOT NULL AND pu.polling_unit_name != ''
+            FROM polling_unit_path p
+            JOIN polling_unit pu ON pu.uniqueid = p.polling_unit_uniqueid
+            LEFT JOIN ward w ON w.uniqueid = p.ward_uniqueid
+            WHERE p.lga_uniqueid = %s AND pu.polling_unit_name IS NOT NULL AND pu.polling_unit_name != ''
             ORDER BY w.ward_name, pu.polling_unit_name
-        ''', [lga.lga_id])
-        
-        data = [
+        ''', [lga.uniqueid])
+        return rows_response(request, ('uniqueid', 'name', 'number', 'ward'), polling_units)
+    
+    except Lga.DoesNotExist:
+        return json_response(request, [])
+
+
+# =============================================================================
+# API Endpoint for batched polling unit results
+# =============================================================================
+
+def api_polling_unit_results(request):
+    """
+    API endpoint: metadata and party scores for many polling units at once,
+    e.g. ?ids=8,9,10 (at most RESULTS_BATCH_MAX_POLLING_UNITS ids).
+
+    Always runs two queries, however many ids are passed. Add ?format=columnar
+    for one array per field instead of one object per polling unit.
+    """
+    max_ids = getattr(settings, 'RESULTS_BATCH_MAX_POLLING_UNITS', 100)
+    try:
+        pu_ids = list(dict.fromkeys(int(i) for i in request.GET.get('ids', '').split(',') if i.strip()))
+    except ValueError:
+        return json_response(
+            request, {'error': 'ids must be a comma separated list of polling unit ids.'}, status=400
+        )
+    if not pu_ids:
+        return json_response(request, {'error': 'Pass at least one polling unit id in ?ids='}, status=400)
+    if len(pu_ids) > max_ids:
+        return json_response(request, {'error': f'At most {max_ids} polling units per request.'}, status=400)
+
+    # Query 1: polling unit, ward and LGA names
+    placeholders = ', '.join(['%s'] * len(pu_ids))
+    with connections[router.db_for_read(PollingUnit)].cursor() as cursor:
+        cursor.execute(f'''
+            SELECT pu.uniqueid, pu.polling_unit_name, pu.polling_unit_number, w.ward_name, l.lga_name
+            FROM polling_unit_path p
+            JOIN polling_unit pu ON pu.uniqueid = p.polling_unit_uniqueid
+            JOIN lga l ON l.uniqueid = p.lga_uniqueid
+            LEFT JOIN ward w ON w.uniqueid = p.ward_uniqueid
+            WHERE p.state_id = %s AND p.polling_unit_uniqueid IN ({placeholders})
+        ''', [get_state_id(request), *pu_ids])
+        units = {row[0]: row for row in cursor.fetchall()}
+
+    # Query 2: every party score for those polling units
+    scores = {uniqueid: {} for uniqueid in units}
+    rows = AnnouncedPuResults.objects.filter(
+        polling_unit_uniqueid__in=[str(uniqueid) for uniqueid in units]
+    ).values_list('polling_unit_uniqueid', 'party_abbreviation', 'party_score')
+    for uniqueid, party, score in rows:
+        scores[int(uniqueid)][party] = scores[int(uniqueid)].get(party, 0) + score
+
+    found = [uniqueid for uniqueid in pu_ids if uniqueid in units]
+    missing = [uniqueid for uniqueid in pu_ids if uniqueid not in units]
+
+    if request.GET.get('format') == 'columnar':
+        parties = sorted({party for pu_scores in scores.values() for party in pu_scores})
+        data = {
+            'uniqueid': found,
+            'name': [units[uniqueid][1] for uniqueid in found],
+            'number': [units[uniqueid][2] for uniqueid in found],
+            'ward': [units[uniqueid][3] for uniqueid in found],
+            'lga': [units[uniqueid][4] for uniqueid in found],
+            'total_votes': [sum(scores[uniqueid].values()) for uniqueid in found],
+            'scores': {party: [scores[uniqueid].get(party, 0) for uniqueid in found] for party in parties},
+            'missing': missing,
+        }
+        return json_response(request, data)
+
+    data = {
+        'polling_units': [
             {
-                'uniqueid': pu.uniqueid,
-                'name': pu.polling_unit_name,
-                'number': pu.polling_unit_number,
-                'ward': pu.ward_name
+                'uniqueid': uniqueid,
+                'name': units[uniqueid][1],
+                'number': units[uniqueid][2],
+                'ward': units[uniqueid][3],
+                'lga': units[uniqueid][4],
+                'results': scores[uniqueid],
+                'total_votes': sum(scores[uniqueid].values()),
             }
-            for pu in polling_units
-        ]
-        return JsonResponse(data, safe=False)
-    
+            for uniqueid in found
+        ],
+        'missing': missing,
+    }
+    return json_response(request, data)
+
+
+# =============================================================================
+# API Endpoints for the results timeline ("results as of T")
+# =============================================================================
+
+def api_lga_results_as_of(request, lga_uniqueid):
+    """
+    API endpoint: cumulative LGA totals as they stood at ?at=<ISO datetime>
+    (defaults to now). Served from the time buckets in timeline.py.
+    """
+    try:
+        lga = Lga.objects.get(uniqueid=lga_uniqueid, state_id=get_state_id(request))
     except Lga.DoesNotExist:
-        return JsonResponse([], safe=False)
+        return json_response(request, {'error': 'LGA not found.'}, status=404)
+
+    at = request.GET.get('at')
+    try:
+        # parse_datetime returns None for malformed input but raises
+        # ValueError for well-formed, impossible dates like Feb 30
+        moment = parse_datetime(at) if at else timezone.now()
+    except ValueError:
+        moment = None
+    if moment is None:
+        return json_response(request, {'error': 'Invalid "at" datetime, use ISO 8601.'}, status=400)
+
+    as_of, rows = timeline.results_as_of(lga.uniqueid, moment)
+    data = {
+        'lga_uniqueid': lga.uniqueid,
+        'lga_name': lga.lga_name,
+        'as_of': as_of.isoformat(),
+        'results': [{'party': party, 'total_score': total} for party, total in rows],
+        'total_votes': sum(total for _, total in rows),
+    }
+    return json_response(request, data)
+
+
+def api_lga_results_timeline(request, lga_uniqueid):
+    """API endpoint: cumulative LGA totals at the end of every time bucket."""
+    try:
+        lga = Lga.objects.get(uniqueid=lga_uniqueid, state_id=get_state_id(request))
+    except Lga.DoesNotExist:
+        return json_response(request, {'error': 'LGA not found.'}, status=404)
+
+    data = {
+        'lga_uniqueid': lga.uniqueid,
+        'lga_name': lga.lga_name,
+        'bucket_seconds': timeline.get_bucket_seconds(),
+        'timeline': [
+            {'as_of': as_of.isoformat(), 'totals': totals}
+            for as_of, totals in timeline.lga_timeline(lga.uniqueid)
+        ],
+    }
+    return json_response(request, data)
+
+
+# =============================================================================
+# API Endpoint for totals across states (fan-out over the state partitions)
+# =============================================================================
+
+def api_party_totals(request):
+    """
+    API endpoint: party totals summed over all polling units in one or more
+    states, e.g. ?states=25,26 (defaults to every state; at most
+    RESULTS_PARTY_TOTALS_MAX_STATES ids, and unknown ones are dropped).
+    Each state is queried on its own partition and the results are merged.
+    """
+    max_states = getattr(settings, 'RESULTS_PARTY_TOTALS_MAX_STATES', 37)
+    known_state_ids = set(State.objects.values_list('state_id', flat=True)) | set(partitions.get_state_databases())
+    states = request.GET.get('states')
+    if not states:
+        state_ids = sorted(known_state_ids)
+    else:
+        try:
+            state_ids = list(dict.fromkeys(int(s) for s in states.split(',') if s.strip()))
+        except ValueError:
+            return json_response(
+                request, {'error': 'states must be a comma separated list of state ids.'}, status=400
+            )
+        if len(state_ids) > max_states:
+            return json_response(request, {'error': f'At most {max_states} states per request.'}, status=400)
+        state_ids = [state_id for state_id in state_ids if state_id in known_state_ids]
+
+    merged, per_state = partitions.party_totals_across_states(state_ids)
+    data = {
+        'states': state_ids,
+        'totals': merged,
+        'total_votes': sum(merged.values()),
+        'by_state': {str(state_id): totals for state_id, totals in per_state.items()},
+    }
+    return json_response(request, data)
+
+
+# =============================================================================
+# API Endpoint for ranked races (precomputed winners and margins)
+# =============================================================================
+
+RACE_NAME_LOOKUPS = {
+    'pu': (PollingUnit, 'polling_unit_name'),
+    'ward': (Ward, 'ward_name'),
+    'lga': (Lga, 'lga_name'),
+}
+
+
+def api_races(request):
+    """
+    API endpoint: ranked races from the precomputed race summaries.
+
+    ?level=pu|ward|lga (default lga), ?order=closest|margin (default closest),
+    ?party=PDP (only races that party won), ?lga_id=<LGA uniqueid>, ?limit=20.
+    """
+    level = request.GET.get('level', 'lga')
+    order = request.GET.get('order', 'closest')
+    if level not in RACE_NAME_LOOKUPS or order not in ('closest', 'margin'):
+        return json_response(
+            request, {'error': 'level must be pu, ward or lga and order closest or margin.'}, status=400
+        )
+    try:
+        limit = max(1, min(int(request.GET.get('limit', 20)), 100))
+        lga_uniqueid = int(request.GET['lga_id']) if request.GET.get('lga_id') else None
+    except ValueError:
+        return json_response(request, {'error': 'limit and lga_id must be numbers.'}, status=400)
+
+    top = races.top_races(
+        get_state_id(request), level, order=order, party=request.GET.get('party'),
+        lga_uniqueid=lga_uniqueid, limit=limit,
+    )
+    model, name_field = RACE_NAME_LOOKUPS[level]
+    names = dict(
+        model.objects.filter(uniqueid__in=[race.area_uniqueid for race in top]).values_list('uniqueid', name_field)
+    )
+    data = [
+        {
+            'level': race.level,
+            'uniqueid': race.area_uniqueid,
+            'name': names.get(race.area_uniqueid),
+            'lga_uniqueid': race.lga_uniqueid,
+            'winner': race.winner,
+            'winner_score': race.winner_score,
+            'runner_up': race.runner_up,
+            'runner_up_score': race.runner_up_score,
+            'margin': race.margin,
+            'turnout': race.turnout,
+        }
+        for race in top
+    ]
+    return json_response(request, data)
+
+
+# =============================================================================
+# Request profiler captures (staff only)
+# =============================================================================
+
+@staff_member_required
+def profile_list(request):
+    """List the stored request profiles, newest first."""
+    context = {'captures': profiling.list_captures()}
+    return render(request, 'results/profile_list.html', context)
+
+
+@staff_member_required
+def profile_detail(request, name):
+    """Show one stored request profile: SQL, query plans and cProfile output."""
+    capture = profiling.load_capture(name)
+    if capture is None:
+        raise Http404('Profile not found.')
+    context = {'name': name, 'capture': capture}
+    return render(request, 'results/profile_detail.html', context)
 
 
 # =============================================================================
 # Helper Functions
 # =============================================================================
 
+def get_state_id(request):
+    """The state this request is for (set by StatePartitionMiddleware)."""
+    return getattr(request, 'state_id', None) or partitions.state_id_from_request(request)
+
+
 def get_client_ip(request):
     """Get the client's IP address from the request."""
     x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')